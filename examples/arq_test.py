@@ -1,23 +1,39 @@
-from arq import create_pool
-from permissible.crud.backends.arq import ARQBackend, CreateSchema, ARQSessionMaker, GetSchema, ArqSessionAbortFailure
+from permissible.crud.backends.arq import ARQBackend, CreateSchema, ARQSessionMaker, GetSchema, ArqSessionAbortFailure, \
+        wait_for_result_in_pool, enable_result_notifications
 import asyncio
 from arq.connections import RedisSettings
-import time
 from random import random
 from math import log10
+from concurrent.futures import ProcessPoolExecutor
+import os
+
+REDIS_SETTINGS = RedisSettings(host='localhost')
+
+# A single pool is shared by every session for the lifetime of the process
+sessionmaker = ARQSessionMaker(settings=REDIS_SETTINGS)
+backend = ARQBackend(sessionmaker)
+
+def compute(random_3):
+    return log10(abs(log10(random_3**random_3**random_3)))
+
+async def startup(ctx):
+    ctx['executor'] = ProcessPoolExecutor(max_workers=os.cpu_count())
+
+async def shutdown(ctx):
+    ctx['executor'].shutdown()
 
 async def test_func(ctx):
     random_3 = 2*random()
-    for i in range(20000000):
-        list_of_list = log10(abs(log10(random_3**random_3**random_3)))
-    return list_of_list
+    # Run the CPU-bound work in a separate process, so that the worker's
+    # event loop can still service heartbeats and aborts in the meantime
+    return await asyncio.get_running_loop().run_in_executor(ctx['executor'], compute, random_3)
 
 async def main():
-    pool = await create_pool()
-
-    sessionmaker = ARQSessionMaker(pool=pool)
-    backend = ARQBackend(sessionmaker)
+    pool = await sessionmaker.connect()
+    await enable_result_notifications(pool)
     session = sessionmaker()
+    # Reads the committed state of the pool, unaffected by session's pending operations
+    poll_session = sessionmaker()
 
     data = CreateSchema(function='test_func', defer_by=1)
     create_data = await backend.create(session = session, data = data)
@@ -25,23 +41,22 @@ async def main():
     get_data = GetSchema(job_id = job_id)
     #delete_data = await backend.delete(session=session, data = get_data)
     #await session.commit()
-    n=1
     read_data = await backend.read(session = session, data = get_data)
     print(read_data)
     await session.commit()
     delete_data = await backend.delete(session=session, data = get_data)
-    while n<20:
-        read_data = await backend.read(session = sessionmaker(), data = get_data)
-        print(read_data)
-        time.sleep(0.5)
-        print()
-        n = n+1
+    # Block until the worker writes the result, rather than polling for it
+    if not await wait_for_result_in_pool(pool, job_id, timeout=30):
+        print(f'Job {job_id} did not complete within 30s')
+        return
+    read_data = await backend.read(session = poll_session, data = get_data)
+    print(read_data)
     try:
         await session.commit()
     except ArqSessionAbortFailure as e:
-        job_id = str(e).split(': ')[1]
-        session.remove_operations(job_id)
-    await session.commit()
+        # The job completed before it could be aborted.  The rest of the
+        # session was still committed
+        print(f'Could not abort: {e}')
     read_data = await backend.read(session = session, data = get_data)
 
     print(read_data)
@@ -49,7 +64,15 @@ async def main():
 
 class WorkerSettings:
     functions = [test_func]
+    on_startup = startup
+    on_shutdown = shutdown
     allow_abort_jobs = True
 
+async def run():
+    try:
+        await main()
+    finally:
+        await sessionmaker.close()
+
 if __name__ == '__main__':
-    asyncio.run(main())
\ No newline at end of file
+    asyncio.run(run())
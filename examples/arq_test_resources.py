@@ -1,50 +1,64 @@
-from arq import create_pool
-from permissible.crud.backends.arq import ARQBackend, CreateSchema, ARQSessionMaker, GetSchema, ArqSessionAbortFailure, JobPromiseModel, JobModel, GetModel, PoolJobCompleted
+from permissible.crud.backends.arq import ARQBackend, CreateSchema, ARQSessionMaker, GetSchema, ArqSessionAbortFailure, JobPromiseModel, JobModel, GetModel, PoolJobCompleted, \
+        wait_for_result_in_pool, enable_result_notifications
 import asyncio
 from permissible import CRUDResource, Create, Read, Update, Delete, Permission, Action, Principal
 from arq.connections import RedisSettings
-import time
 from random import random
 from math import log10
+from concurrent.futures import ProcessPoolExecutor
+import os
 from pydantic import BaseModel
 from typing import Optional, Any
 from datetime import datetime
+
+REDIS_SETTINGS = RedisSettings(host='localhost')
+
+# A single pool is shared by every session for the lifetime of the process
+sessionmaker = ARQSessionMaker(settings=REDIS_SETTINGS)
+backend = ARQBackend(sessionmaker)
+
+def compute(random_3):
+    return log10(abs(log10(random_3**random_3**random_3)))
+
+async def startup(ctx):
+    ctx['executor'] = ProcessPoolExecutor(max_workers=os.cpu_count())
+
+async def shutdown(ctx):
+    ctx['executor'].shutdown()
+
 async def test_func(ctx):
     random_3 = 2*random()
-    for i in range(20000000):
-        list_of_list = log10(abs(log10(random_3**random_3**random_3)))
-    return list_of_list
+    # Run the CPU-bound work in a separate process, so that the worker's
+    # event loop can still service heartbeats and aborts in the meantime
+    return await asyncio.get_running_loop().run_in_executor(ctx['executor'], compute, random_3)
 
-async def main():
+ProfileResource = CRUDResource(
+    # Admin interface to create profiles
+    Create[CreateSchema, JobPromiseModel](
+        name='admin_create',
+        permissions=[Permission(Action.ALLOW, Principal('group', 'admin'))],
+        input_schema=CreateSchema,
+        output_schema=GetModel
+    ),
+    Read[GetSchema, GetModel](
+        name='admin_read',
+        permissions=[Permission(Action.ALLOW, Principal('group', 'admin'))],
+        input_schema=GetSchema,
+        output_schema=GetModel
+    ),
+    Delete[GetSchema, GetModel](
+        name='admin_delete',
+        permissions=[Permission(Action.ALLOW, Principal('group', 'admin'))],
+        input_schema=GetSchema,
+        output_schema=GetModel
+    ),
+    backend=backend
+)
 
-    loop = asyncio.get_running_loop()
-    pool_fut = loop.create_future()
-    sessionmaker = ARQSessionMaker(pool_future=pool_fut)
-    backend = ARQBackend(sessionmaker)
-    pool_fut.set_result(await create_pool())
-    session = await sessionmaker.get_session()
-    ProfileResource = CRUDResource(
-        # Admin interface to create profiles
-        Create[CreateSchema, JobPromiseModel](
-            name='admin_create',
-            permissions=[Permission(Action.ALLOW, Principal('group', 'admin'))],
-            input_schema=CreateSchema,
-            output_schema=GetModel
-        ),
-        Read[GetSchema, GetModel](
-            name='admin_read',
-            permissions=[Permission(Action.ALLOW, Principal('group', 'admin'))],
-            input_schema=GetSchema,
-            output_schema=GetModel
-        ),
-        Delete[GetSchema, GetModel](
-            name='admin_delete',
-            permissions=[Permission(Action.ALLOW, Principal('group', 'admin'))],
-            input_schema=GetSchema,
-            output_schema=GetModel
-        ),
-        backend=backend
-    )
+async def main():
+    pool = await sessionmaker.connect()
+    await enable_result_notifications(pool)
+    session = sessionmaker()
 
     created = await ProfileResource.create(
         'admin_create',
@@ -70,15 +84,17 @@ async def main():
     )
     print(read)
 
-    for i in range(10):
-        time.sleep(0.5)
-        read = await ProfileResource.read(
-            'admin_read',
-            {'job_id': created.job_id},
-            principals=[Principal('group', 'admin')],
-            session=session
-        )
-        print(read)
+    # Block until the worker writes the result, rather than polling for it
+    if not await wait_for_result_in_pool(pool, created.job_id, timeout=30):
+        print(f'Job {created.job_id} did not complete within 30s')
+        return
+    read = await ProfileResource.read(
+        'admin_read',
+        {'job_id': created.job_id},
+        principals=[Principal('group', 'admin')],
+        session=session
+    )
+    print(read)
     
     await session.commit()
     try:
@@ -95,7 +111,15 @@ async def main():
 
 class WorkerSettings:
     functions = [test_func]
+    on_startup = startup
+    on_shutdown = shutdown
     allow_abort_jobs = True
 
+async def run():
+    try:
+        await main()
+    finally:
+        await sessionmaker.close()
+
 if __name__ == '__main__':
-    asyncio.run(main())
+    asyncio.run(run())
@@ -1,6 +1,7 @@
 from pydantic import BaseModel
 from typing import Callable, Generator, Optional, Type
 from contextlib import contextmanager
+from io import BytesIO
 import asyncio
 import uuid
 
@@ -36,6 +37,10 @@ ImageResource = CRUDResource(
                                     Principal('group', 'user'))]),
         backend=FileBackend)
 
+def read_file(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
+
 async def main():
     # Invoke admin_create to create a new profile as an administrative user
     image_id_1 = uuid.uuid4()
@@ -43,22 +48,28 @@ async def main():
     print(f"image_id_1: {image_id_1}")
     print(f"image_id_2: {image_id_2}")
 
-    with transaction_manager() as transaction:
+    # Read the images from disk without blocking the event loop
+    loop = asyncio.get_running_loop()
+    blue, foundations = await asyncio.gather(
+        loop.run_in_executor(None, read_file, "/usr/share/backgrounds/sway/Sway_Wallpaper_Blue_1920x1080.png"),
+        loop.run_in_executor(None, read_file, "/usr/share/backgrounds/eddos/wallpaper_1920x1080_x4_foundations.png"))
+
+    async with transaction_manager() as transaction:
         await ImageResource.create(
                 'public_create',
-                {"uuid": image_id_1, "file": open("/usr/share/backgrounds/sway/Sway_Wallpaper_Blue_1920x1080.png", "rb")},
+                {"uuid": image_id_1, "file": BytesIO(blue)},
                 principals=[Principal('group', 'user')],
                 transaction=transaction)
 
         await ImageResource.create(
                 'public_create',
-                {"uuid": image_id_2, "file": open("/usr/share/backgrounds/sway/Sway_Wallpaper_Blue_1920x1080.png", "rb")},
+                {"uuid": image_id_2, "file": BytesIO(blue)},
                 principals=[Principal('group', 'user')],
                 transaction=transaction)
 
         await ImageResource.update(
                 'public_update',
-                {"uuid": image_id_1, "file": open("/usr/share/backgrounds/eddos/wallpaper_1920x1080_x4_foundations.png", "rb")},
+                {"uuid": image_id_1, "file": BytesIO(foundations)},
                 principals=[Principal('group', 'user')],
                 transaction=transaction)
 
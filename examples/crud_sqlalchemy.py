@@ -1,15 +1,17 @@
-from permissible.crud.backends.sqlalchemy import QuerySchema, AlreadyExistsError
+from permissible.crud.backends.sqlalchemy import QuerySchema, AlreadyExistsError, \
+        cached_sqlalchemy_to_pydantic
 from pydantic import BaseModel
 from typing import Callable, Generator, Optional, Type
 from contextlib import contextmanager
 
 from permissible import CRUDResource, SQLAlchemyCRUDBackend, \
-        Create, Read, Update, Delete, Action, Permission, Principal
+        Create, Read, Update, Delete, Action, Permission, Principal, \
+        transaction_manager
 
 from sqlalchemy.ext.declarative import DeclarativeMeta, declarative_base
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy import create_engine, String, Text, Column, Integer
-from pydantic_sqlalchemy import sqlalchemy_to_pydantic
+from sqlalchemy.pool import QueuePool
+from sqlalchemy import create_engine, event, String, Text, Column, Integer
 import asyncio
 # In this example, we define a Profile resource, which is accessible
 # through admin and restricted accesses
@@ -19,10 +21,24 @@ import asyncio
 # perform limited modifications.
 
 
+# SQLAlchemy defaults to NullPool for file-based SQLite, opening a new
+# connection for every session, so share a pool of connections instead
 engine = create_engine(
     "sqlite:///./test.db",
+    poolclass=QueuePool,
+    pool_size=10,
+    max_overflow=20,
+    pool_pre_ping=True,
     connect_args={'check_same_thread': False}
 )
+
+@event.listens_for(engine, 'connect')
+def set_sqlite_pragma(dbapi_connection, connection_record):
+    # WAL with synchronous=NORMAL fsyncs on checkpoint rather than every commit
+    cursor = dbapi_connection.cursor()
+    cursor.execute('PRAGMA journal_mode=WAL')
+    cursor.execute('PRAGMA synchronous=NORMAL')
+    cursor.close()
 Session = sessionmaker(bind=engine)
 
 declarative_base_instance: DeclarativeMeta = declarative_base()
@@ -35,7 +51,7 @@ declarative_base_instance.metadata.create_all(engine)
 
 ProfileBackend = SQLAlchemyCRUDBackend(BackModel, Session)
 
-CreateProfile = sqlalchemy_to_pydantic(BackModel, exclude = ['age'])
+CreateProfile = cached_sqlalchemy_to_pydantic(BackModel, exclude = ('age',))
 Profile = ProfileBackend.Schema
 DeleteProfile = ProfileBackend.DeleteSchema
 OutputQuerySchema = ProfileBackend.OutputQuerySchema
@@ -82,45 +98,55 @@ ProfileResource = CRUDResource(
         backend=ProfileBackend
     )
 
+# Validate the query once, rather than on every read
+MR_BEAN_QUERY = QuerySchema(
+    filter_spec=[{'field': 'full_name', 'op': '==', 'value': 'Mr. Bean'}])
+
 # Invoke admin_create to create a new profile as an administrative user
 async def main():
-    try:
-        await ProfileResource.create(
-                'admin_create',
-                {'full_name': 'Johnny English', 'age': 58},
-                principals=[Principal('group', 'admin')],
-                transaction=None)
-    except AlreadyExistsError:
-        pass
+    # Perform every modification within a single transaction, so that they
+    # are written out by one commit
+    async with transaction_manager() as transaction:
+        try:
+            await ProfileResource.create(
+                    'admin_create',
+                    {'full_name': 'Johnny English', 'age': 58},
+                    principals=[Principal('group', 'admin')],
+                    transaction=transaction)
+        except AlreadyExistsError:
+            pass
 
-    # Invoke restricted_create to create a new profile as an unprivileged user
-    try:
-        await ProfileResource.create(
-                'restricted_create',
-                {'full_name': 'Mr. Bean'},
-                principals=[Principal('group', 'user')],
-                transaction=None)
-    except AlreadyExistsError:
-        pass
+        # Invoke restricted_create to create a new profile as an unprivileged user
+        try:
+            await ProfileResource.create(
+                    'restricted_create',
+                    {'full_name': 'Mr. Bean'},
+                    principals=[Principal('group', 'user')],
+                    transaction=transaction)
+        except AlreadyExistsError:
+            pass
 
+        test = await ProfileResource.read(
+            'admin_read', 
+            MR_BEAN_QUERY,
+            principals=[Principal('group', 'admin')],
+            transaction=transaction
+        )
+        test = await ProfileResource.update(
+            'admin_update', 
+            {'full_name': 'Johnny English', 'age': 20},
+            principals=[Principal('group', 'admin')],
+            transaction=transaction
+        )
+        test = await ProfileResource.delete(
+            'admin_delete', 
+            {'full_name': 'Johnny English'},
+            principals=[Principal('group', 'admin')],
+            transaction=transaction
+        )
     test = await ProfileResource.read(
         'admin_read', 
-        {'filter_spec': [{'field': 'full_name', 'op': '==', 'value': 'Mr. Bean'}]},
-        principals=[Principal('group', 'admin')]
-    )
-    test = await ProfileResource.update(
-        'admin_update', 
-        {'full_name': 'Johnny English', 'age': 20},
-        principals=[Principal('group', 'admin')]
-    )
-    test = await ProfileResource.delete(
-        'admin_delete', 
-        {'full_name': 'Johnny English'},
-        principals=[Principal('group', 'admin')]
-    )
-    test = await ProfileResource.read(
-        'admin_read', 
-        {'filter_spec': [{'field': 'full_name', 'op': '==', 'value': 'Mr. Bean'}]},
+        MR_BEAN_QUERY,
         principals=[Principal('group', 'admin')]
     )
     print(test)
@@ -1,6 +1,9 @@
+__version__ = '0.1.0'
+
 from .core import Transaction, transaction_manager
-from .permissions import Action, Permission, Principal
-from .crud import CRUDResource, Create, Read, Update, Delete
+from .permissions import Action, Permission, Principal, StaticPermissions, \
+        DynamicPermissions
+from .crud import CRUDResource, Create, CreateMany, Read, Update, Delete
 from .crud import PrintCRUDBackend, LocalFileCRUDBackend, FileCreate, FileRead, FileUpdate, FileDelete
 
 try:
@@ -1,13 +1,16 @@
-from collections import defaultdict
-from contextlib import contextmanager
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
 from dataclasses import dataclass
 from pydantic import BaseModel
 from typing import Any, Callable, Dict, Generator, Generic, List, Optional, \
-                   Type, TypeVar, Union
+                   Tuple, Type, TypeVar, Union
 
-from permissible.permissions import UnauthorisedError, Action, \
-        BaseAccessType, Principal, Permission, has_permission
+from permissible.permissions import UnauthorisedError, BaseAccessType, \
+        BasePermissions, Principal, Permission, as_permissions
 import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
 
 
 # From fastapi users
@@ -17,12 +20,18 @@ async def run_handler(handler: Callable, *args, **kwargs):
     else:
         return handler(*args, **kwargs)
 
+def _identity(data):
+    return data
+
 class BaseSession:
     """
     Write the session out persistently.  This action is not permitted to fail.
     Any integrity checks and lock obtaining must happen before the commit.
     The behaviour of running both commit and rollback is undefined.
     """
+    # Allows subclasses to declare __slots__ of their own
+    __slots__ = ()
+
     def commit(self):
         raise NotImplementedError('Subclass implements this')
 
@@ -43,8 +52,11 @@ class Transaction():
     either all of the sessions commit, or none of them do.
     The behaviour of running both commit and rollback is undefined.
     """
-    sessions: Dict[str, BaseSession] = {} # TODO: there's a problem with this rather than initialising in __init__
-                    # What was it?...
+    sessions: Dict[str, BaseSession]
+
+    def __init__(self):
+        # Per transaction; sessions are committed in the order they were added
+        self.sessions = {}
 
     def __setitem__(self, key: str, session: Session) -> Session:
         self.sessions[key] = session
@@ -53,30 +65,50 @@ class Transaction():
     def __getitem__(self, key: str) -> Session:
         return self.sessions[key]
 
-    def commit(self):
-        # TODO: could this be an async for, considering it's over IO?
+    # The sessions' methods may be async, so are run through run_handler.
+    # They're run one after another, so that a session failing to commit
+    # stops every later session from committing
+
+    async def commit(self):
         for session in self.sessions.values():
-            # TODO: we may need run_handler here if the session's method can be optionally async
-            session.commit()
-    
-    def rollback(self, error: Exception):
+            await run_handler(session.commit)
+
+    async def rollback(self, error: Exception):
         for session in self.sessions.values():
-            session.rollback()
+            await run_handler(session.rollback)
         raise error
-    
-    def close(self):
+
+    async def close(self):
         for session in self.sessions.values():
-            session.close()
+            await run_handler(session.close)
+
+# The transaction of the innermost transaction_manager of the current context,
+# which accesses made without a transaction take part in
+_current_transaction: ContextVar[Optional[Transaction]] = \
+        ContextVar('_current_transaction', default=None)
+
+def current_transaction() -> Optional[Transaction]:
+    return _current_transaction.get()
 
-@contextmanager
-def transaction_manager():
+@asynccontextmanager
+async def transaction_manager():
+    """
+    An asynchronous context manager, used as
+    `async with transaction_manager() as transaction`, since the sessions
+    may need to await their commits and rollbacks.
+    Accesses made without a transaction inside the block join this one, so
+    are committed, or rolled back, along with it.
+    """
+    t = Transaction()
+    token = _current_transaction.set(t)
     try:
-        t = Transaction()
         yield t
     except Exception as e:
-        t.rollback(e)
+        await t.rollback(e)
+    else:
+        await t.commit()
     finally:
-        t.commit()
+        _current_transaction.reset(token)
 
 # Backend definition
 
@@ -100,10 +132,10 @@ class Backend(Generic[AccessType]):
     which define the possible interactions with the backend's data store.
     """
 
-    _access_records: Dict[AccessType, BackendAccessRecord] = {}
+    _access_records: Dict[AccessType, BackendAccessRecord]
     _access_methods: \
         Dict[AccessType,
-             Callable[[Any, BaseSession], OutputSchema]] = {}
+             Callable[[Any, BaseSession], OutputSchema]]
 
     def _register_access(
             self,
@@ -113,12 +145,34 @@ class Backend(Generic[AccessType]):
         The details of the access are defined in r.
         The resulting access can be subsequently invoked through __call__.
         """
-        async def access(data: Any, session: BaseSession) -> OutputSchema:
-            processed_data = await run_handler(r.process, session, r.input_schema.parse_obj(data))
-            if r.output_schema is None:
+        process = r.process
+        input_schema = r.input_schema
+        output_schema = r.output_schema
+
+        # Data validated by the Resource, or returned already validated by
+        # the process, needn't be validated again.  The exact type is checked,
+        # since parsing a subclass instance strips any fields the schema lacks
+        def parse_input(data):
+            if type(data) is input_schema:
+                return data
+            else:
+                return input_schema.parse_obj(data)
+
+        def parse_output(data):
+            if output_schema is None:
                 return None
+            elif type(data) is output_schema:
+                return data
             else:
-                return r.output_schema.parse_obj(processed_data)
+                return output_schema.parse_obj(data)
+
+        # Decide once whether the process must be awaited
+        if asyncio.iscoroutinefunction(process):
+            async def access(data: Any, session: BaseSession) -> OutputSchema:
+                return parse_output(await process(session, parse_input(data)))
+        else:
+            async def access(data: Any, session: BaseSession) -> OutputSchema:
+                return parse_output(process(session, parse_input(data)))
         return access
 
     def __init__(
@@ -128,9 +182,12 @@ class Backend(Generic[AccessType]):
         Initialises a new Backend with methods as specified within the
         recs, in accordance with AccessType
         """
-        print("adding access records")
+        self._access_records = {}
+        self._access_methods = {}
+        # The key under which this backend's session is held in transactions
+        self._transaction_key = self.__class__.__name__
         for r in recs:
-            print(f"{r.type_}")
+            logger.debug('registering access %s', r.type_)
             self._access_records[r.type_] = r
             self._access_methods[r.type_] = self._register_access(r)
 
@@ -141,9 +198,9 @@ class Backend(Generic[AccessType]):
         session.
         """
         try:
-            session = transaction[self.__class__.__name__]
+            session = transaction[self._transaction_key]
         except KeyError:
-            session = transaction[self.__class__.__name__] = self._generate_session()
+            session = transaction[self._transaction_key] = self._generate_session()
         return await self._access_methods[type_](data, session)
 
     @contextmanager
@@ -177,6 +234,7 @@ class AccessRecord(
     """
     name: AccessName
     permissions: Union[
+            BasePermissions,
             List[Permission], 
             Callable[[BaseModel], List[Permission]]]
     input_schema: Type[InputSchema]
@@ -196,16 +254,16 @@ class Resource(Generic[AccessType]):
     """
 
     _backend: Backend
-    _access_records: Dict[AccessType, Dict[AccessName, AccessRecord]] = \
-        defaultdict(dict)
+    # Unions of the schemas accepted and returned by all of the accesses
+    input_schema: Any
+    output_schema: Any
+    _access_records: Dict[AccessType, Dict[AccessName, AccessRecord]]
     _access_methods: \
         Dict[
-            AccessType,
-            Dict[
-                AccessName,
-                Callable[[Any, List[Principal], Optional[BaseSession]],
-                         OutputSchema]
-            ]] = defaultdict(dict)
+            Tuple[AccessType, AccessName],
+            Callable[[Any, List[Principal], Optional[BaseSession]],
+                     OutputSchema]
+        ]
 
     def _register_access(
             self,
@@ -215,58 +273,70 @@ class Resource(Generic[AccessType]):
         The details of the access are defined in r.
         The resulting access can be subsequently invoked through __call__.
         """
-        def pre_process(data):
-            if r.pre_process is None:
+        # Bound once here, rather than looked up on r for every invocation
+        type_ = r.type_
+        permissions = as_permissions(r.permissions)
+        input_schema = r.input_schema
+        output_schema = r.output_schema
+
+        def parse_input(data):
+            # Data that has already been validated needn't be validated again
+            if type(data) is input_schema:
                 return data
             else:
-                return r.pre_process(data)
+                return input_schema.parse_obj(data)
 
-        def post_process(data):
-            if r.post_process is None:
+        pre_process = r.pre_process if r.pre_process is not None else _identity
+        post_process = r.post_process if r.post_process is not None else _identity
+
+        def parse_output(data):
+            if output_schema is None:
+                return None
+            data = post_process(data)
+            # The exact type is checked, so that the fields of a subclass
+            # instance are still restricted to those of output_schema
+            if type(data) is output_schema:
                 return data
             else:
-                return r.post_process(data)
-
-        async def access(
-                data: Any,
-                principals: List[Principal],
-                transaction: Optional[Transaction] = None) -> OutputSchema:
-            # Check permissions
-            if isinstance(r.permissions, list):
-                # Evaluate static permissions
-                if has_permission(principals, r.permissions) == Action.ALLOW:
-                    processed_data = pre_process(r.input_schema.parse_obj(data))
-                    if transaction is None:
-                        with transaction_manager() as transaction:
-                            output_data = await self._backend(r.type_, processed_data, transaction)
-
-                    else:
-                        output_data = await self._backend(r.type_, processed_data, transaction)
-                    if r.output_schema is None:
-                        return None
-                    else:
-                        return r.output_schema.parse_obj(post_process(output_data))
-                else:
+                return output_schema.parse_obj(data)
+
+        if permissions.before_access:
+            # Permissions known in advance are evaluated before accessing the
+            # backend
+            async def access(
+                    data: Any,
+                    principals: List[Principal],
+                    transaction: Optional[Transaction] = None) -> OutputSchema:
+                if not permissions.check(principals):
                     raise UnauthorisedError
-            else:
-                # Evaluate dynamic permissions
-                processed_data = pre_process(
-                        r.input_schema.parse_obj(data))
+                processed_data = pre_process(parse_input(data))
+                if transaction is None:
+                    transaction = _current_transaction.get()
+                if transaction is None:
+                    async with transaction_manager() as transaction:
+                        output_data = await self._backend(type_, processed_data, transaction)
+                else:
+                    output_data = await self._backend(type_, processed_data, transaction)
+                return parse_output(output_data)
+        else:
+            # Otherwise, permissions are evaluated on the output of the backend
+            async def access(
+                    data: Any,
+                    principals: List[Principal],
+                    transaction: Optional[Transaction] = None) -> OutputSchema:
+                processed_data = pre_process(parse_input(data))
+                if transaction is None:
+                    transaction = _current_transaction.get()
                 if transaction is None:
-                    with transaction_manager() as transaction:
-                        output_data = await self._backend(r.type_, processed_data, transaction)
-                        if has_permission(principals, r.permissions(
-                                output_data)) != Action.ALLOW:
+                    async with transaction_manager() as transaction:
+                        output_data = await self._backend(type_, processed_data, transaction)
+                        if not permissions.check(principals, output_data):
                             raise UnauthorisedError
                 else:
-                    output_data = self._backend(r.type_, processed_data, transaction)
-                    if has_permission(principals, r.permissions(
-                            output_data)) != Action.ALLOW:
+                    output_data = await self._backend(type_, processed_data, transaction)
+                    if not permissions.check(principals, output_data):
                         raise UnauthorisedError
-                if r.output_schema is None:
-                    return None
-                else:
-                    return r.output_schema.parse_obj(post_process(output_data))
+                return parse_output(output_data)
 
         return access
 
@@ -277,10 +347,18 @@ class Resource(Generic[AccessType]):
         Initialises a new Resource with methods as specified within the
         recs, in accordance with AccessType
         """
+        self._access_records = {}
+        self._access_methods = {}
         for r in recs:
-            self._access_records[r.type_][r.name] = r
+            self._access_records.setdefault(r.type_, {})[r.name] = r
             method = self._register_access(r)
-            self._access_methods[r.type_][r.name] = method
+            self._access_methods[(r.type_, r.name)] = method
+        # Computed once, so that consumers such as API integrations needn't
+        # rebuild them from the access records
+        self.input_schema = Union[tuple(r.input_schema for r in recs)] \
+            if recs else None
+        self.output_schema = Union[tuple(r.output_schema for r in recs)] \
+            if recs else None
         self._backend = backend
 
     async def __call__(self, type_: AccessType, name: AccessName, data: Any,
@@ -290,4 +368,5 @@ class Resource(Generic[AccessType]):
         Invoke an access on data of the given type and name, on a user with
         the given principals within the context of the transaction.
         """
-        return await run_handler(self._access_methods[type_][name], data, principals, transaction)
+        # Accesses are always coroutine functions, so needn't go via run_handler
+        return await self._access_methods[(type_, name)](data, principals, transaction)
@@ -1,4 +1,4 @@
-from .core import CRUDResource, Create, Read, Update, Delete
+from .core import CRUDResource, Create, CreateMany, Read, Update, Delete
 
 from .backends.print import PrintCRUDBackend
 from .backends.file import LocalFileCRUDBackend, FileCreate, FileRead, FileUpdate, FileDelete
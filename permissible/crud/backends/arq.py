@@ -1,16 +1,26 @@
 from arq import create_pool
-from arq.connections import RedisSettings, ArqRedis, SSLContext
+import aioredis
+from arq.connections import RedisSettings, ArqRedis, SSLContext, \
+        expires_extra_ms
 from arq.jobs import Job
 from permissible.core import BaseSession
-from typing import Any, Optional, Union, Dict, Callable, Generator, List
+from typing import Any, Optional, Union, Dict, Callable, Generator, List, Tuple, Type
 from datetime import datetime, timedelta
 from pydantic import BaseModel
 from permissible.crud.core import CRUDBackend, CRUDAccessType, CRUDBackendAccessRecord
 from contextlib import contextmanager, asynccontextmanager
 import uuid
-from time import time
-from dataclasses import dataclass, asdict
-from arq.jobs import deserialize_job, JobDef, JobResult
+from time import time_ns
+from dataclasses import dataclass
+from arq.jobs import deserialize_job, deserialize_result, serialize_job, \
+        JobDef, JobResult, Serializer, Deserializer
+from arq.constants import abort_jobs_ss, in_progress_key_prefix, \
+        job_key_prefix, result_key_prefix
+from arq.utils import to_ms, to_unix_ms
+from aioredis import ReplyError, WatchVariableError
+from hashlib import sha1
+import asyncio
+import warnings
 """
 Analogies
 
@@ -85,60 +95,198 @@ class PoolJobAlreadyExists(ValueError):
 class ArqSessionAbortFailure(ValueError):
     pass
 
-def as_int(f: float) -> int:
-    return int(round(f))
-
 def timestamp_ms() -> int:
-    return as_int(time() * 1000)
-
-async def abort_in_pool(pool, job_id) -> bool:
-    results = await pool.all_job_results()
-    results_found = {i.job_id: i for i in results}
-    await pool.zadd('arq:abort', timestamp_ms(), job_id)
-    status = None
-    if await pool.exists('arq:result:' + job_id):
-        status = 'complete'
-    elif await pool.exists('arq:in-progress:' + job_id):
-        status = 'in_progress'
-    abort_complete = not(status == 'in_progress' or status == 'complete')
-    return abort_complete
+    return time_ns() // 1_000_000
 
 async def get_info_from_pool(pool, job_id, queue_name) -> Optional[JobDef]:
-    results = await pool.all_job_results()
-    results_found = {i.job_id: i for i in results}
-    if job_id in results_found:
-        info = results_found[job_id]
+    # Fetch only this job's result, rather than every result in the pool
+    info = None
+    v = await pool.get(result_key_prefix + job_id, encoding=None)
+    if v:
+        info = deserialize_result(v, deserializer=pool.job_deserializer)
     else:
-        info = None
-    if not info:
-        v = await pool.get('arq:job:' + job_id, encoding=None)
-
+        v = await pool.get(job_key_prefix + job_id, encoding=None)
         if v:
-            info = deserialize_job(v)
+            info = deserialize_job(v, deserializer=pool.job_deserializer)
     if info:
         info.score = await pool.zscore(queue_name, job_id)
     return info
 
+STATUS_LUA = """
+if redis.call('EXISTS', KEYS[1]) == 1 then
+    return 'complete'
+elseif redis.call('EXISTS', KEYS[2]) == 1 then
+    return 'in_progress'
+end
+local score = redis.call('ZSCORE', KEYS[3], ARGV[1])
+if not score then
+    return 'not_found'
+elseif tonumber(score) > tonumber(ARGV[2]) then
+    return 'deferred'
+end
+return 'queued'
+"""
+STATUS_LUA_SHA = sha1(STATUS_LUA.encode()).hexdigest()
+
+async def eval_script(pool, script: str, sha: str, keys: List[str], args: List[Any]):
+    """
+    Evaluate the Lua script by its SHA1 digest, falling back to sending the
+    whole script if Redis doesn't have it cached yet.
+    """
+    try:
+        return await pool.evalsha(sha, keys, args)
+    except ReplyError as e:
+        if not str(e).startswith('NOSCRIPT'):
+            raise
+        return await pool.eval(script, keys, args)
+
+ABORT_LUA = """
+if redis.call('EXISTS', KEYS[1]) == 1 then
+    return 'complete'
+elseif redis.call('EXISTS', KEYS[2]) == 1 then
+    return 'in_progress'
+end
+redis.call('ZADD', KEYS[3], ARGV[1], ARGV[2])
+return 'ok'
+"""
+ABORT_LUA_SHA = sha1(ABORT_LUA.encode()).hexdigest()
+
+def abort_keys(job_id) -> List[str]:
+    return [result_key_prefix + job_id, in_progress_key_prefix + job_id, abort_jobs_ss]
+
+async def abort_in_pool(pool, job_id) -> bool:
+    """
+    Abort the job, unless it's already complete or in progress.
+    The check and the abort are made atomically by Redis.
+    """
+    result = await eval_script(pool, ABORT_LUA, ABORT_LUA_SHA,
+                               abort_keys(job_id), [timestamp_ms(), job_id])
+    return result == 'ok'
+
 async def get_status_from_pool(pool, job_id, queue_name) -> str:
     """
-    Status of the job.
+    Status of the job, resolved by Redis atomically in a single round-trip.
+    """
+    return await eval_script(
+        pool, STATUS_LUA, STATUS_LUA_SHA,
+        [result_key_prefix + job_id, in_progress_key_prefix + job_id, queue_name],
+        [job_id, timestamp_ms()])
+
+async def enable_result_notifications(pool):
+    """
+    Enable the keyspace notifications upon which wait_for_result_in_pool
+    relies, in addition to any which are already enabled.
+    """
+    events = (await pool.config_get('notify-keyspace-events')) \
+            .get('notify-keyspace-events', '')
+    # 'A' is an alias which already includes '$'
+    missing = [c for c in 'K$' if c not in events and not (c == '$' and 'A' in events)]
+    if missing:
+        await pool.config_set('notify-keyspace-events', events + ''.join(missing))
+
+async def wait_for_result_in_pool(pool, job_id, timeout: Optional[float] = None) -> bool:
+    """
+    Wait for the result of the job to be written, without polling.
+    Relies upon keyspace notifications being enabled on the Redis server
+    (notify-keyspace-events must include at least 'K$').  Redis disables
+    them by default, in which case this only returns once the timeout has
+    elapsed; enable them in the server's configuration, or with
+    enable_result_notifications.
+    Returns whether the result was written before the timeout elapsed.
+    The pool must be a connection pool: subscribing on a single multiplexed
+    connection would place it into pub/sub mode.
+    """
+    if not isinstance(pool.connection, aioredis.abc.AbcPool):
+        raise ValueError('Cannot wait for results over a multiplexed '
+                         'connection; use a connection pool')
+    key = result_key_prefix + job_id
+    channel_name = f'__keyspace@{pool.db}__:{key}'
+    channel, = await pool.subscribe(channel_name)
+
+    async def wait_for_set():
+        # The result may already have been written before we subscribed
+        while not await pool.exists(key):
+            if not await channel.wait_message():
+                raise ValueError(f'Channel {channel_name} closed')
+            await channel.get()
+
+    try:
+        await asyncio.wait_for(wait_for_set(), timeout)
+        return True
+    except asyncio.TimeoutError:
+        return False
+    finally:
+        await pool.unsubscribe(channel_name)
+
+async def get_many_from_pool(pool, job_ids, queue_name) -> List[Tuple[Optional[JobDef], str]]:
+    """
+    Info and status of each of the jobs, fetched in a single pipeline.
+    """
+    pipe = pool.pipeline()
+    futures = [(
+        pipe.get(result_key_prefix + job_id, encoding=None),
+        pipe.get(job_key_prefix + job_id, encoding=None),
+        pipe.exists(in_progress_key_prefix + job_id),
+        pipe.zscore(queue_name, job_id)
+    ) for job_id in job_ids]
+    await pipe.execute()
+
+    now = timestamp_ms()
+    found = []
+    for result_f, job_f, in_progress_f, score_f in futures:
+        result, job, in_progress, score = result_f.result(), \
+                job_f.result(), in_progress_f.result(), score_f.result()
+        if result:
+            info, status = deserialize_result(result, deserializer=pool.job_deserializer), 'complete'
+        elif job:
+            info = deserialize_job(job, deserializer=pool.job_deserializer)
+            if in_progress:
+                status = 'in_progress'
+            elif not score:
+                status = 'not_found'
+            else:
+                status = 'deferred' if score > now else 'queued'
+        else:
+            info, status = None, 'not_found'
+        if info:
+            info.score = score
+        found.append((info, status))
+    return found
+
+def enqueue_in_transaction(tr, pool, create_model: CreateSchema,
+                           enqueue_time_ms: int):
+    """
+    Queue the commands with which enqueue_job would enqueue the job onto
+    the transaction tr.
     """
-    if await pool.exists('arq:result:' + job_id):
-        return 'complete'
-    elif await pool.exists('arq:in-progress:' + job_id):
-        return 'in_progress'
+    job_id = create_model.job_id
+    queue_name = create_model.queue_name or pool.default_queue_name
+    defer_by_ms = to_ms(create_model.defer_by)
+    expires_ms = to_ms(create_model.expires)
+
+    if create_model.defer_until is not None:
+        score = to_unix_ms(create_model.defer_until)
+    elif defer_by_ms:
+        score = enqueue_time_ms + defer_by_ms
     else:
-        score = await pool.zscore(queue_name, job_id)
-        if not score:
-            return 'not_found'
-        return 'deferred' if score > timestamp_ms() else 'queued'
+        score = enqueue_time_ms
+    expires_ms = expires_ms or score - enqueue_time_ms + expires_extra_ms
 
+    job = serialize_job(create_model.function, (), create_model.function_args,
+                        create_model.job_try, enqueue_time_ms,
+                        serializer=pool.job_serializer)
+    tr.psetex(job_key_prefix + job_id, expires_ms, job)
+    tr.zadd(queue_name, score, job_id)
+
+# Declared by hand, since dataclass(slots=True) requires Python 3.10
 @dataclass
 class Add:
+    __slots__ = ('create_model',)
     create_model: CreateSchema
 
 @dataclass
 class Delete:
+    __slots__ = ('job_id',)
     job_id: str
 
 @dataclass
@@ -172,101 +320,347 @@ class JobResultModel(JobDefModel):
 
 JobModel = Union[JobPromiseModel, JobDefModel, JobResultModel]
 
+def construct_model(model: Type[BaseModel], values: Dict[str, Any]) -> BaseModel:
+    """
+    Build the model from values which are already known to be valid,
+    without validating them.  As with validation, values which aren't
+    fields of the model are ignored.
+    """
+    return model.construct(**{name: values[name] for name in model.__fields__
+                              if name in values})
+
 class ARQSession(BaseSession):
     pool: ArqRedis
-    operations: Dict[str, Union[Add, Delete]]
-    def __init__(self, pool):
+    operations: List[Tuple[str, Union[Add, Delete]]]
+    _last_by_id: Dict[str, int]
+    _default_queue_name: str
+    _commit_lock: Optional[asyncio.Lock]
+    def __init__(self, pool, commit_lock: Optional[asyncio.Lock] = None):
+        """
+        commit_lock serialises the commits of sessions which share a single
+        connection, whose WATCHes would otherwise interfere with each other.
+        """
         self.pool = pool
-        self.operations = {}
+        self._commit_lock = commit_lock
+        self.operations = []
+        self._last_by_id = {}
+        self._default_queue_name = pool.default_queue_name
     
+    def _append(self, job_id, operation):
+        self._last_by_id[job_id] = len(self.operations)
+        self.operations.append((job_id, operation))
+
     async def add(self, job_create: CreateSchema):
-        if job_create.job_id in self.operations:
-            self.operations[job_create.job_id].append(Add(create_model = job_create))
-        else:
-            self.operations[job_create.job_id] = [Add(create_model = job_create)]
-        return JobPromiseModel(function = job_create.function, job_id = job_create.job_id, status='promise')
+        self._append(job_create.job_id, Add(create_model = job_create))
+        return JobPromiseModel.construct(function = job_create.function, job_id = job_create.job_id, status='promise')
     
     async def delete(self, job_id):
-        if job_id in self.operations:
-            self.operations[job_id].append(Delete(job_id = job_id))
-        else:
-            self.operations[job_id] = [Delete(job_id = job_id)]
+        self._append(job_id, Delete(job_id = job_id))
     
-    async def query(self, job_id, queue_name = None):
-        if queue_name is None:
-            queue_name = self.pool.default_queue_name
+    async def exists(self, job_id) -> bool:
+        """
+        Whether the job was last added by this session, or otherwise exists
+        in the pool, checked with a single EXISTS.  A job last deleted by this
+        session still exists if it's in the pool, since its keys remain there
+        after it's aborted and so it can't be enqueued again.
+        """
+        index = self._last_by_id.get(job_id)
+        if index is not None and isinstance(self.operations[index][1], Add):
+            return True
+        return await self.pool.exists(result_key_prefix + job_id,
+                                      job_key_prefix + job_id) > 0
 
-        info = None
-        status = None
-        if job_id in self.operations:
-            last_operation = self.operations[job_id][-1]
+    def _query_operations(self, job_id):
+        """
+        Look up the job in the uncommitted operations of this session.
+        Returns (info, status), where info is ... if the job has been
+        deleted, or None if the session holds no operations on the job.
+        """
+        index = self._last_by_id.get(job_id)
+        if index is not None:
+            last_operation = self.operations[index][1]
             if isinstance(last_operation, Add):
-                last_dict = last_operation.create_model.dict()
-                info = JobPromise(last_dict['function'], job_id)
-                status = 'promise'
+                return JobPromise(last_operation.create_model.function, job_id), 'promise'
             else:
-                info = ...
-                status = None
+                return ..., None
+        return None, None
 
-        if info is None:
-            info = await get_info_from_pool(self.pool, job_id, queue_name)
-            status = await get_status_from_pool(self.pool, job_id, queue_name)
-        if info == ...:
-            info = None
-        
+    @staticmethod
+    def _as_model(job_id, info, status) -> Optional[JobModel]:
         if isinstance(info, JobPromise):
-            return JobPromiseModel(**asdict(info), status=status)
+            model = JobPromiseModel
         elif isinstance(info, JobResult):
-            info_dict = asdict(info)
-            info_dict['status'] = status
-            info_dict['job_id'] = job_id
-            return JobResultModel(**info_dict)
+            model = JobResultModel
         elif isinstance(info, JobDef):
-            info_dict = asdict(info)
-            info_dict['status'] = status
-            info_dict['job_id'] = job_id
-            return JobDefModel(**info_dict)
-
-        elif info is None:
+            model = JobDefModel
+        else:
             return None
+        # A shallow copy of the fields, where asdict would deep copy them
+        return construct_model(model, {**vars(info), 'status': status,
+                                       'job_id': job_id})
+
+    async def query(self, job_id, queue_name = None):
+        if queue_name is None:
+            queue_name = self._default_queue_name
+
+        info, status = self._query_operations(job_id)
+        if info is None:
+            info, status = await asyncio.gather(
+                get_info_from_pool(self.pool, job_id, queue_name),
+                get_status_from_pool(self.pool, job_id, queue_name))
+        return self._as_model(job_id, info, status)
+
+    async def query_many(self, job_ids: List[str], queue_name = None) -> List[Optional[JobModel]]:
+        """
+        Query several jobs at once, batching the lookups of all jobs not
+        held by this session into a single pipelined round-trip.
+        """
+        if queue_name is None:
+            queue_name = self._default_queue_name
+
+        found = {job_id: self._query_operations(job_id) for job_id in job_ids}
+        in_pool = [job_id for job_id, (info, _) in found.items() if info is None]
+        if in_pool:
+            from_pool = await get_many_from_pool(self.pool, in_pool, queue_name)
+            found.update(zip(in_pool, from_pool))
+        return [self._as_model(job_id, *found[job_id]) for job_id in job_ids]
+
+    @staticmethod
+    def _net_operations(operations, existing) -> List[Union[Add, Delete]]:
+        """
+        Drop the operations which would have no effect on the pool: enqueues
+        of jobs which already exist, and jobs which are both enqueued and
+        then aborted by this session, which needn't be sent at all.  A job
+        enqueued again after being aborted by this session is still sent.
+        """
+        net = []
+        enqueued = {}
+        cancelled = set()
+        for operation in operations:
+            if isinstance(operation, Add):
+                job_id = operation.create_model.job_id
+                if job_id in existing or job_id in enqueued:
+                    continue
+                enqueued[job_id] = len(net)
+                net.append(operation)
+            elif operation.job_id in enqueued:
+                net[enqueued.pop(operation.job_id)] = None
+                cancelled.add(operation.job_id)
+            elif operation.job_id not in cancelled:
+                net.append(operation)
+        return [operation for operation in net if operation is not None]
 
     async def commit(self):
-        for job_id, operations in self.operations.items():
-            for operation in operations:
+        """
+        Write every operation to the pool in a single transaction.  The
+        operations are spent by the commit even if it raises, since the
+        transaction may already have been applied, so that a retried commit
+        can't replay any of them.
+        """
+        operations = [operation for _, operation in self.operations]
+        for operation in operations:
+            if not isinstance(operation, (Add, Delete)):
+                raise ValueError(f'Unknown operation {operation}')
+
+        try:
+            if self._commit_lock is None:
+                aborts = await self._write_operations(operations)
+            else:
+                async with self._commit_lock:
+                    aborts = await self._write_operations(operations)
+        finally:
+            self.operations = []
+            self._last_by_id = {}
+
+        for job_id, result in aborts:
+            if await result != 'ok':
+                raise ArqSessionAbortFailure(f'Job_id: {job_id}')
+
+    async def _write_operations(self, operations):
+        """
+        Write the operations to the pool, returning the job ids and results
+        of their aborts.
+        """
+        add_ids = [operation.create_model.job_id for operation in operations
+                   if isinstance(operation, Add)]
+
+        with await self.pool as conn:
+            # As with enqueue_job, jobs which already exist aren't enqueued,
+            # and the job keys are watched in case they're enqueued meanwhile
+            pipe = conn.pipeline()
+            pipe.unwatch()
+            if add_ids:
+                pipe.watch(*(job_key_prefix + job_id for job_id in add_ids))
+            exists = [(job_id,
+                       pipe.exists(job_key_prefix + job_id),
+                       pipe.exists(result_key_prefix + job_id))
+                      for job_id in add_ids]
+            await pipe.execute()
+            existing = {job_id for job_id, job_exists, result_exists in exists
+                        if await job_exists or await result_exists}
+
+            # Every remaining operation is then written in a single transaction
+            enqueue_time_ms = timestamp_ms()
+            tr = conn.multi_exec()
+            aborts = []
+            for operation in self._net_operations(operations, existing):
                 if isinstance(operation, Add):
-                    input_data = operation.create_model.dict()
-                    job_details = {
-                        'function': input_data['function'],
-                        '_job_id': input_data['job_id'],
-                        '_queue_name': input_data['queue_name'],
-                        '_defer_until': input_data['defer_until'],
-                        '_defer_by': input_data['defer_by'],
-                        '_expires': input_data['expires'],
-                        '_job_try': input_data['job_try'],
-                        **input_data['function_args']
-                    }
-                    await self.pool.enqueue_job(**job_details)
-                elif isinstance(operation, Delete):
-                    abort_completed = await abort_in_pool(self.pool, operation.job_id)
-                    if not abort_completed:
-                        raise ArqSessionAbortFailure(f'Job_id: {operation.job_id}')
+                    enqueue_in_transaction(tr, self.pool,
+                                           operation.create_model,
+                                           enqueue_time_ms)
                 else:
-                    raise ValueError(f'Unknown operation {operation}')
-        self.operations = {}
+                    # EVAL rather than EVALSHA, since a NOSCRIPT error
+                    # couldn't be retried from within the transaction
+                    aborts.append((operation.job_id, tr.eval(
+                        ABORT_LUA, abort_keys(operation.job_id),
+                        [enqueue_time_ms, operation.job_id])))
+            # Every result is collected, so that none is left unretrieved
+            results = await tr.execute(return_exceptions=True)
+
+        errors = [result for result in results if isinstance(result, Exception)]
+        if any(isinstance(error, WatchVariableError) for error in errors):
+            # A job got enqueued since we checked whether it existed
+            raise PoolJobAlreadyExists()
+        elif errors:
+            raise errors[0]
+        return aborts
     
     async def close(self):
-        self.operations = {}
+        self.operations = []
+        self._last_by_id = {}
     
     async def remove_operations(self, job_id):
-        self.operations.pop(job_id)
+        if job_id not in self._last_by_id:
+            raise KeyError(job_id)
+        operations = [(i, operation) for i, operation in self.operations
+                      if i != job_id]
+        self.operations = []
+        self._last_by_id = {}
+        for i, operation in operations:
+            self._append(i, operation)
+
+
+async def create_multiplexed_connection(
+        settings: Optional[RedisSettings] = None,
+        job_serializer: Optional[Serializer] = None,
+        job_deserializer: Optional[Deserializer] = None) -> ArqRedis:
+    """
+    Open a single Redis connection, wrapped as an ArqRedis.
+    aioredis pipelines the commands of concurrent coroutines over the one
+    connection, avoiding the per-command checkout of a connection pool.
+    """
+    if settings is None:
+        settings = RedisSettings()
+    conn = await aioredis.create_connection(
+        (settings.host, settings.port),
+        db=settings.database,
+        password=settings.password,
+        ssl=settings.ssl,
+        timeout=settings.conn_timeout,
+        encoding='utf8')
+    return ArqRedis(conn, job_serializer=job_serializer,
+                    job_deserializer=job_deserializer)
 
 
 class ARQSessionMaker:
-    def __init__(self, pool_future):
-        self.pool_future = pool_future 
-    async def get_session(self):
-        await self.pool_future
-        return ARQSession(self.pool_future.result())
+    """
+    Produces ARQSessions which all share the same long-lived ArqRedis pool,
+    so that connections are reused across sessions rather than being
+    re-established for each one.
+
+    The pool may either be supplied directly, or created from settings by
+    connect(), allowing the session maker to be constructed before the
+    event loop is running.
+    """
+    pool: Optional[ArqRedis]
+    pool_future: Optional['asyncio.Future[ArqRedis]']
+    settings: Optional[RedisSettings]
+    multiplexed: bool
+    job_serializer: Optional[Serializer]
+    job_deserializer: Optional[Deserializer]
+
+    def __init__(self, pool: Optional[ArqRedis] = None,
+                 settings: Optional[RedisSettings] = None,
+                 multiplexed: bool = False,
+                 job_serializer: Optional[Serializer] = None,
+                 job_deserializer: Optional[Deserializer] = None,
+                 pool_future: Optional['asyncio.Future[ArqRedis]'] = None):
+        """
+        If multiplexed, connect() opens a single connection over which all
+        concurrent commands are pipelined, rather than a connection pool.
+        A multiplexed connection cannot be used to wait_for_result_in_pool,
+        since subscribing would place it into pub/sub mode.  The commits of
+        its sessions are serialised, since they WATCH the one connection.
+
+        job_serializer and job_deserializer replace pickle as the encoding
+        of the job payloads, e.g. with msgpack.packb and
+        functools.partial(msgpack.unpackb, raw=False).  The workers must
+        be configured with the same pair.
+
+        pool_future, a future of the pool, is deprecated in favour of pool
+        or settings.  It may still be passed in place of pool.
+        """
+        if asyncio.isfuture(pool):
+            pool, pool_future = None, pool
+        if pool_future is not None:
+            warnings.warn('pool_future is deprecated; pass pool or settings '
+                          'instead', DeprecationWarning, stacklevel=2)
+        self.pool = pool
+        self.pool_future = pool_future
+        self.settings = settings
+        self.multiplexed = multiplexed
+        self.job_serializer = job_serializer
+        self.job_deserializer = job_deserializer
+        # Created lazily, so that they bind to the running event loop
+        self._pool_lock: Optional[asyncio.Lock] = None
+        self._commit_lock: Optional[asyncio.Lock] = None
+
+    async def connect(self) -> ArqRedis:
+        """
+        Create the shared pool if it doesn't yet exist, and return it.
+        """
+        if self._pool_lock is None:
+            self._pool_lock = asyncio.Lock()
+        async with self._pool_lock:
+            if self.pool is None and self.pool_future is not None:
+                self.pool = await self.pool_future
+            elif self.pool is None and self.multiplexed:
+                self.pool = await create_multiplexed_connection(
+                    self.settings, job_serializer=self.job_serializer,
+                    job_deserializer=self.job_deserializer)
+            elif self.pool is None:
+                self.pool = await create_pool(
+                    self.settings, job_serializer=self.job_serializer,
+                    job_deserializer=self.job_deserializer)
+        return self.pool
+
+    async def close(self):
+        if self.pool is not None:
+            self.pool.close()
+            await self.pool.wait_closed()
+            self.pool = None
+
+    async def get_session(self) -> ARQSession:
+        """
+        Deprecated: await connect() once, then call the session maker.
+        """
+        warnings.warn('get_session is deprecated; await connect() once, then '
+                      'call the session maker', DeprecationWarning, stacklevel=2)
+        await self.connect()
+        return self()
+
+    def __call__(self) -> ARQSession:
+        """
+        Construct a new session on the shared pool.  This is cheap, but each
+        command the session issues still checks out a pool connection, so
+        reuse sessions where their isolation allows rather than creating
+        one per read.
+        """
+        if self.pool is None:
+            raise ValueError('ARQSessionMaker is not connected')
+        if self.multiplexed and self._commit_lock is None:
+            self._commit_lock = asyncio.Lock()
+        return ARQSession(self.pool, self._commit_lock)
 
 
 class ARQBackend(CRUDBackend):
@@ -277,17 +671,18 @@ class ARQBackend(CRUDBackend):
     ):
         self.session_maker = session_maker
         async def create(session: ARQSession, data: CreateSchema) -> JobPromiseModel:
-            job_data = data.dict(by_alias=True)
-            if job_data['job_id'] is None:
-                job_data['job_id'] = str(uuid.uuid4())
-
-            job_id = job_data['job_id']
-            return_model = CreateSchema.parse_obj(job_data)
-            result = await session.query(return_model.job_id)
-            if result is not None:
+            job_id = data.job_id
+            if job_id is None:
+                # A freshly generated id cannot already exist in the pool,
+                # so the round-trip to check for it is skipped.
+                # data has already been validated, so copy it without
+                # revalidating
+                job_id = uuid.uuid4().hex
+                data = data.copy(update={'job_id': job_id})
+            elif await session.exists(job_id):
                 raise PoolJobAlreadyExists()
-            await session.add(return_model)
-            return await session.query(job_id)
+
+            return await session.add(data)
 
         async def read(session: ARQSession, data: GetSchema) -> JobPromiseModel:
             result = await session.query(data.job_id)
@@ -304,24 +699,32 @@ class ARQBackend(CRUDBackend):
             await session.delete(data.job_id)
             return result
         
+        async def read_many(session: ARQSession, data: List[GetSchema]) -> List[JobModel]:
+            results = await session.query_many([d.job_id for d in data])
+            for d, result in zip(data, results):
+                if result is None:
+                    raise PoolJobNotFound(d.job_id)
+            return results
+
         self.create = create
         self.read = read
+        self.read_many = read_many
         self.delete = delete
 
         super().__init__(
-            CRUDBackendAccessRecord[CreateSchema, GetModel, ARQSession](
+            CRUDBackendAccessRecord[CreateSchema, GetModel](
                 CreateSchema,
                 GetModel,
                 create,
                 CRUDAccessType.create
             ),
-            CRUDBackendAccessRecord[GetSchema, GetModel, ARQSession](
+            CRUDBackendAccessRecord[GetSchema, GetModel](
                 GetSchema,
                 GetModel,
                 read,
                 CRUDAccessType.read
             ),
-            CRUDBackendAccessRecord[GetSchema, GetModel, ARQSession](
+            CRUDBackendAccessRecord[GetSchema, GetModel](
                 GetSchema,
                 GetModel,
                 delete,
@@ -329,13 +732,18 @@ class ARQBackend(CRUDBackend):
             )
         )
 
+    def _generate_session(self) -> ARQSession:
+        """
+        Generate a new session in case the user didn't specify one yet
+        """
+        return self.session_maker()
 
     @asynccontextmanager
-    async def generate_session(self) -> Generator[ArqRedis, None, None]:
+    async def generate_session(self) -> Generator[ARQSession, None, None]:
         """
         Generate a new session in case the user didn't specify one yet
         """
-        session = await self.session_maker.get_session()
+        session = self.session_maker()
         try:
             yield session
         finally:
@@ -1,5 +1,5 @@
 from typing import Any, Callable, Dict, Generator, Generic, List, Optional, \
-                   Tuple, Type, TypeVar, Union
+                   Tuple, Type, TypeVar, Union, TYPE_CHECKING
 from contextlib import asynccontextmanager
 from pathlib import Path
 from os import PathLike
@@ -9,15 +9,27 @@ from permissible.core import BaseSession, InputSchema, OutputSchema
 from permissible.crud.core import CRUDBackend, CreateSchema, ReadSchema, \
         UpdateSchema, DeleteSchema, CRUDAccessType, CRUDBackendAccessRecord, \
         Create, Read, Update, Delete
-from io import BufferedReader
+from io import BufferedIOBase, BufferedReader
 from uuid import UUID, uuid4
 from dataclasses import dataclass
-from fasteners import InterProcessLock
+from functools import lru_cache
+import logging
+from concurrent.futures import ThreadPoolExecutor, wait
+import os
+import shutil
+import stat
+
+if TYPE_CHECKING:
+    from fasteners import InterProcessLock
+
+logger = logging.getLogger(__name__)
+
+COPY_BUFFER_SIZE = 1 << 20
 
 
 class FileCreateSchema(BaseModel):
     uuid: UUID = Field(default_factory=uuid4)
-    file: BufferedReader
+    file: BufferedIOBase
     class Config:
         arbitrary_types_allowed = True
 
@@ -28,7 +40,7 @@ class FileReadSchema(BaseModel):
 
 class FileUpdateSchema(BaseModel):
     uuid: UUID
-    file: BufferedReader
+    file: BufferedIOBase
     class Config:
         arbitrary_types_allowed = True
 
@@ -48,35 +60,131 @@ class FileReturnSchema(BaseModel):
         arbitrary_types_allowed = True
 
 
+# Shared by all sessions, to write out the files of each commit concurrently
+COMMIT_EXECUTOR = ThreadPoolExecutor(max_workers=32)
+
+
+@lru_cache(maxsize=1)
+def _inter_process_lock() -> Type['InterProcessLock']:
+    # fasteners is imported on first use, since importing permissible
+    # imports this module whether or not the file backend is used
+    from fasteners import InterProcessLock
+    return InterProcessLock
+
+
+# Whether each type of operation writes its file, rather than deleting it.
+# Subclasses of the schemas are added as they're first committed
+WRITES_FILE: Dict[type, bool] = {
+    FileCreateSchema: True, FileUpdateSchema: True, FileDeleteSchema: False}
+
+
+def _writes_file(operation_type: type) -> Optional[bool]:
+    # Only reached by subclasses of the schemas, or unknown types, for
+    # which None is returned
+    if issubclass(operation_type, (FileCreateSchema, FileUpdateSchema)):
+        writes_file = True
+    elif issubclass(operation_type, FileDeleteSchema):
+        writes_file = False
+    else:
+        return None
+    WRITES_FILE[operation_type] = writes_file
+    return writes_file
+
+
+def lock_path(path: Path) -> str:
+    return os.fspath(path) + ".lock"
+
+
+def _unlink(path: Union[Path, str]):
+    # Calls straight down to the syscall, unlike Path.unlink(missing_ok=True)
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+
+
+def _copy_in_kernel(src_fd: int, dst_fd: int, offset: int, count: int) -> bool:
+    """
+    Copy count bytes from offset in src_fd to dst_fd without passing them
+    through userspace.  Returns False if the kernel supports neither way of
+    doing so for these files, in which case nothing has been copied.
+    """
+    copied = 0
+    for copy in (getattr(os, "copy_file_range", None), os.sendfile):
+        if copy is None:
+            continue
+        try:
+            while copied < count:
+                if copy is os.sendfile:
+                    n = os.sendfile(dst_fd, src_fd, offset + copied, count - copied)
+                else:
+                    n = copy(src_fd, dst_fd, count - copied, offset + copied)
+                if n == 0:
+                    break
+                copied += n
+            return True
+        except OSError:
+            # e.g. copying across filesystems on older kernels, or sendfile
+            # to a regular file on some platforms
+            if copied:
+                raise
+    return False
+
+
+def _write_file(path: Path, file: BufferedIOBase):
+    with open(path, "wb", buffering=COPY_BUFFER_SIZE) as f:
+        # Uploads are often spooled to a regular file, which can be copied
+        # within the kernel
+        try:
+            src_fd = file.fileno()
+            src_stat = os.fstat(src_fd)
+        except OSError:
+            src_fd = None
+        if src_fd is None or not stat.S_ISREG(src_stat.st_mode) or \
+                not _copy_in_kernel(src_fd, f.fileno(), file.tell(),
+                                    src_stat.st_size - file.tell()):
+            # Stream the file across in chunks, rather than reading the whole
+            # of it into memory first
+            shutil.copyfileobj(file, f, COPY_BUFFER_SIZE)
+        f.flush()
+        os.fsync(f.fileno())
+
+
 class FileSession(BaseSession):
+    __slots__ = ('path', 'temporary', 'state')
     path: Path
-    state: Dict[UUID, Tuple[Union[FileCreateSchema, FileUpdateSchema, FileDeleteSchema, None], InterProcessLock]]
+    temporary: List[Tuple[Path, Path]]
+    # Each uuid's pending operation, its lock, and the path of its file
+    state: Dict[UUID, Tuple[Union[FileCreateSchema, FileUpdateSchema, FileDeleteSchema, None], 'InterProcessLock', Path]]
 
     # TODO: can this be cleaned up?
     def __init__(self, path: Path):
         self.path = path
         self.state = {}
+        self.temporary = []
         super().__init__()
 
     # Currently add and query are not async, so they can never be scheduled concurrently
     # within a thread.  Therefore, we only utilise an inter-process lock
     def add(self, data: Union[FileCreateSchema, FileUpdateSchema, FileDeleteSchema]):
-        path = self.path.joinpath(data.uuid.hex)
-        if data.uuid not in self.state.keys():
-            lock = InterProcessLock(path.with_suffix(".lock"))
-            self.state[data.uuid] = (None, lock)
+        entry = self.state.get(data.uuid)
+        if entry is None:
+            path = self.path.joinpath(data.uuid.hex)
+            lock = _inter_process_lock()(lock_path(path))
+            entry = self.state[data.uuid] = (None, lock, path)
             # TODO: add configurable timeouts
-            print(f'acquiring {data.uuid}')
+            logger.debug('acquiring %s', data.uuid)
             lock.acquire()
 
-        exists = self._exists(data.uuid)
+        path = entry[2]
+        exists = self._exists(entry)
         if isinstance(data, FileCreateSchema) and exists:
             raise ValueError(f"File {path} already exists")
         elif isinstance(data, (FileUpdateSchema, FileDeleteSchema,)) and not exists:
             raise ValueError(f"File {path} does not exist")
 
         # Lock acquired
-        self.state[data.uuid] = (data, self.state[data.uuid][1])
+        self.state[data.uuid] = (data, entry[1], path)
 
     # This commit isn't supposed to fail, because it's not supposed to enforce
     # whether files do/don't exist prior to being created/deleted/updated
@@ -92,52 +200,109 @@ class FileSession(BaseSession):
     # We therefore need to rollback as best we can, by releasing all the locks
     # and then reporting the error.
     def commit(self):
-        for (operation, lock) in self.state.values():
-            path = self.path.joinpath(operation.uuid.hex)
-            if isinstance(operation, (FileCreateSchema, FileUpdateSchema,)):
-                try:
-                    with open(path, "wb") as f:
-                        f.write(operation.file.read())
-                except Exception as e:
+        # Write every file aside first, so that a failure or crash part way
+        # through leaves all of the targets untouched
+        # Sort the operations by their exact type in a single pass
+        writes = []
+        deletes = []
+        for (operation, _, path) in self.state.values():
+            if operation is None:
+                # Only queried
+                continue
+            writes_file = WRITES_FILE.get(type(operation))
+            if writes_file is None:
+                writes_file = _writes_file(type(operation))
+                if writes_file is None:
                     self.rollback()
-                    raise e
-                lock.release()
-            elif isinstance(operation, FileDeleteSchema):
-                path.unlink(missing_ok=True)
-                lock.release()
-                # Purge old lock files
-                path.with_suffix(".lock").unlink(missing_ok=True)
-
-    def rollback(self):
-        for k, (_, lock) in self.state.items():
+                    raise TypeError(f"Unknown operation {operation!r}")
+            if writes_file:
+                writes.append((operation, path))
+                self.temporary.append((path.with_suffix(".tmp"), path))
+            else:
+                deletes.append(path)
+        try:
+            if len(writes) == 1:
+                _write_file(self.temporary[0][0], writes[0][0].file)
+            elif writes:
+                # The writes release the GIL, so their disk latencies overlap
+                futures = [COMMIT_EXECUTOR.submit(_write_file, temporary, operation.file)
+                           for (operation, _), (temporary, _) in zip(writes, self.temporary)]
+                wait(futures)
+                for future in futures:
+                    future.result()
+        except Exception as e:
+            self.rollback()
+            raise e
+
+        # Then move them all into place, behind a single directory barrier
+        for (temporary, path) in self.temporary:
+            os.replace(temporary, path)
+        self.temporary = []
+        for path in deletes:
+            _unlink(path)
+        if writes or deletes:
+            self._sync_directory()
+
+        for (_, lock, _) in self.state.values():
             lock.release()
+        for path in deletes:
+            # Purge old lock files
+            _unlink(lock_path(path))
         self.state = {}
 
-    def _exists(self, uuid: UUID):
-        path = self.path.joinpath(uuid.hex)
+    def rollback(self):
+        for (temporary, _) in self.temporary:
+            temporary.unlink(missing_ok=True)
+        self.temporary = []
+        # Release every lock, even if one of them fails to release
+        error = None
+        for (_, lock, _) in self.state.values():
+            try:
+                lock.release()
+            except Exception as e:
+                error = error or e
+        self.state.clear()
+        if error is not None:
+            raise error
+
+    def _sync_directory(self):
+        # Not every platform can open a directory to sync it
+        if not hasattr(os, "O_DIRECTORY"):
+            return
+        dir_fd = os.open(self.path, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+
+    def _exists(self, entry) -> bool:
+        operation, _, path = entry
         if path.exists() and not path.is_file():
             raise ValueError(f"path {path} exists but is not a file")    # TODO: different error
-        try:
-            return isinstance(self.state[uuid][0], (FileCreateSchema, FileUpdateSchema,))
-        except KeyError:
+        # Only a pending operation overrides what's on disk
+        if operation is None:
             return path.is_file()
+        return isinstance(operation, (FileCreateSchema, FileUpdateSchema,))
 
     def query(self, data: Union[FileReadSchema, UUID]):
         uuid = data.uuid if isinstance(data, FileReadSchema) else data
-        if uuid not in self.state.keys():
-            lock = self.state[uuid] = (None, InterProcessLock(self.path.joinpath(uuid.hex).with_suffix(".lock")))
+        entry = self.state.get(uuid)
+        if entry is None:
+            path = self.path.joinpath(uuid.hex)
+            lock = _inter_process_lock()(lock_path(path))
+            entry = self.state[uuid] = (None, lock, path)
             # TODO: add configurable timeouts
-            lock.acquire_lock()
+            lock.acquire()
 
         # Find the last point at which the file was created or updated
-        path = self.path.joinpath(uuid.hex)
+        path = entry[2]
         if path.exists() and not path.is_file():
             raise ValueError(f"path {path} exists but is not a file")    # TODO: different error
 
-        if uuid in self.state.keys() and self.state[uuid][0] is not None:
-            return self.state[uuid][0]
+        if entry[0] is not None:
+            return entry[0]
         else:
-            return open(self.path.joinpath(uuid.hex))
+            return open(path, "rb")
 
 
 @dataclass(frozen=True)
@@ -176,6 +341,13 @@ class FileDelete(Delete[FileDeleteSchema, None]):
     output_schema: Type[OutputSchema] = None
 
 
+# Parameterised once at import, rather than on every backend instantiation
+FileCreateRecord = CRUDBackendAccessRecord[FileCreateSchema, UUIDReturnSchema]
+FileReadRecord = CRUDBackendAccessRecord[ReadSchema, FileReturnSchema]
+FileUpdateRecord = CRUDBackendAccessRecord[UpdateSchema, None]
+FileDeleteRecord = CRUDBackendAccessRecord[DeleteSchema, None]
+
+
 class FileCRUDBackend(
         CRUDBackend):
     """
@@ -194,24 +366,23 @@ class FileCRUDBackend(
         raise NotImplementedError("Sublass implements this")
 
     def __init__(self):
-        print("calling init")
         super().__init__(
-            CRUDBackendAccessRecord[FileCreateSchema, UUIDReturnSchema](
+            FileCreateRecord(
                 FileCreateSchema,
                 UUIDReturnSchema,
                 self.create,
                 CRUDAccessType.create),
-            CRUDBackendAccessRecord[ReadSchema, FileReturnSchema](
+            FileReadRecord(
                 FileReadSchema,
                 FileReturnSchema,
                 self.read,
                 CRUDAccessType.read),
-            CRUDBackendAccessRecord[UpdateSchema, None](
+            FileUpdateRecord(
                 FileUpdateSchema,
                 None,
                 self.update,
                 CRUDAccessType.update),
-            CRUDBackendAccessRecord[DeleteSchema, None](
+            FileDeleteRecord(
                 FileDeleteSchema,
                 None,
                 self.delete,
@@ -227,12 +398,19 @@ class LocalFileCRUDBackend(FileCRUDBackend):
         self.path.mkdir(parents=True, exist_ok=True) # TODO: check mode (defaulting to 511)
         super().__init__()
 
+    # The return schemas are built from already validated data, so they're
+    # constructed without revalidating it.  Since they're then of exactly the
+    # output schema's type, the Backend doesn't revalidate them either.
     def create(self, session: FileSession, data: FileCreateSchema) -> UUIDReturnSchema:
         session.add(data)
-        return UUIDReturnSchema(uuid=data.uuid)
+        return UUIDReturnSchema.construct(uuid=data.uuid)
 
     def read(self, session: FileSession, data: FileReadSchema) -> FileReturnSchema:
-        return session.query(data)
+        file = session.query(data)
+        if isinstance(file, BaseModel):
+            # A pending create or update within this session
+            file = file.file
+        return FileReturnSchema.construct(uuid=data.uuid, file=file)
 
     def update(self, session: FileSession, data: FileUpdateSchema) -> None:
         session.add(data)
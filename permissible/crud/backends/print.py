@@ -1,18 +1,23 @@
 from typing import Any, Callable, Dict, Generator, Generic, List, Optional, \
                    Type, TypeVar
+import logging
+import sys
 from pydantic import BaseModel
 from permissible.core import BaseSession
 from permissible.crud.core import CRUDBackend, CreateSchema, ReadSchema, \
         UpdateSchema, DeleteSchema, CRUDAccessType, CRUDBackendAccessRecord
 
+logger = logging.getLogger(__name__)
+
 
 # TODO: investigate how session should behave after being committed
 #       should state be erased, for commit only happen once?
 class PrintSession(BaseSession):
+    __slots__ = ('state',)
     state: List[str]
 
     def __init__(self):
-        print('session opened')
+        logger.debug('session opened')
         self.state = []
         super().__init__()
     
@@ -20,13 +25,15 @@ class PrintSession(BaseSession):
         self.state.append(text)
     
     def commit(self):
-        print(f'committed {self.state}')
+        # The state is already strings, so join them rather than taking the
+        # repr of the list
+        sys.stdout.write('committed [' + ', '.join(self.state) + ']\n')
 
     def rollback(self):
-        print('session rolled back')
+        logger.debug('session rolled back')
 
     def close(self):
-            print('session closed')
+        logger.debug('session closed')
 
 
 class PrintCRUDBackend(CRUDBackend):
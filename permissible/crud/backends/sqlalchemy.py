@@ -1,9 +1,13 @@
-from typing import Any, Dict, Generator, List, Union, ForwardRef
+from functools import cached_property, lru_cache
+from operator import itemgetter
+from typing import Any, Dict, Generator, List, Optional, Tuple, Type, Union, \
+        ForwardRef
 from permissible.core import BaseSession
 from permissible.crud.core import CRUDBackend, CRUDAccessType, CRUDBackendAccessRecord
-from pydantic import BaseModel, create_model, BaseConfig, conlist
+from pydantic import BaseModel, create_model, BaseConfig, conlist, PrivateAttr
 from pydantic_sqlalchemy import sqlalchemy_to_pydantic
-from sqlalchemy import inspect
+from sqlalchemy import inspect, literal
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session, sessionmaker
 from sqlalchemy_filters import apply_filters
 from enum import Enum
@@ -79,10 +83,60 @@ OrFilter.update_forward_refs()
 NotFilter.update_forward_refs()
     
 
+MON_OPS = frozenset(op.value for op in MonOp)
+BOOLEAN_OPS = frozenset(('and', 'or', 'not'))
+BIN_FILTER_KEYS = frozenset(('field', 'op', 'value'))
+
+
+def copy_plain_filter_spec(spec) -> Optional[Any]:
+    """
+    A copy of a validated spec of plain lists and dicts, exactly as converting
+    its Filter models back would produce it, or None if spec contains Filter
+    models, or keys which validation drops.
+    """
+    if isinstance(spec, list):
+        copied = [copy_plain_filter_spec(s) for s in spec]
+        return None if None in copied else copied
+    elif not isinstance(spec, dict):
+        return None
+    elif len(spec) == 1 and next(iter(spec)) in BOOLEAN_OPS:
+        (op, filters), = spec.items()
+        filters = copy_plain_filter_spec(filters)
+        return None if filters is None else {op: filters}
+    elif spec.keys() <= BIN_FILTER_KEYS and isinstance(spec.get('field'), str) \
+            and isinstance(spec.get('op'), str):
+        # Validation tries BinFilter before MonFilter, whose ops it rejects
+        if spec['op'] in MON_OPS:
+            return {'field': spec['field'], 'op': spec['op']}
+        return {'field': spec['field'], 'op': spec['op'],
+                'value': spec.get('value')}
+    return None
+
+
 class QuerySchema(BaseModel):
     filter_spec: List[Filter]
     #sort_spec
     #pagination_spec
+    # The filter_spec in the form that apply_filters takes, along with the
+    # filter_spec it was derived from
+    _filter_spec_dict: Optional[Tuple[list, list]] = PrivateAttr(None)
+
+    def __init__(self, **data):
+        super().__init__(**data)
+        # A plain filter_spec is already almost in the form that apply_filters
+        # takes, so is copied rather than converted back from the models
+        spec = copy_plain_filter_spec(data.get('filter_spec'))
+        if spec is not None:
+            self._filter_spec_dict = (self.filter_spec, spec)
+
+    def filter_spec_dict(self) -> list:
+        # Converted lazily if filter_spec held Filter models, or was set by
+        # construct() or copy(update=...) rather than __init__
+        if self._filter_spec_dict is None or \
+                self._filter_spec_dict[0] is not self.filter_spec:
+            self._filter_spec_dict = (
+                self.filter_spec, self.dict(by_alias=True)['filter_spec'])
+        return self._filter_spec_dict[1]
 
 
 # TODO: get from webplatform helpers
@@ -97,6 +151,16 @@ def get_type_from_sql_object(sql_object):
     return python_type
 
 
+@lru_cache(maxsize=None)
+def cached_sqlalchemy_to_pydantic(
+        Model, exclude: Tuple[str, ...] = ()) -> Type[BaseModel]:
+    """
+    Memoized sqlalchemy_to_pydantic, so that the reflection and pydantic
+    model generation for each Model happen at most once per process.
+    """
+    return sqlalchemy_to_pydantic(Model, exclude=list(exclude))
+
+
 def get_primary_keys_from_table(Table) -> Dict[str, Any]:
     primary_keys = {}
     for primary_key in inspect(Table.__table__).primary_key:
@@ -125,6 +189,53 @@ class ORMConfig(BaseConfig):
     orm_mode = True
 
 
+# SQLSTATE of unique violations, and the MySQL error code of duplicate keys
+UNIQUE_VIOLATION_SQLSTATE = '23505'
+MYSQL_DUPLICATE_ENTRY = 1062
+
+def is_unique_violation(error: IntegrityError) -> bool:
+    """
+    Whether the IntegrityError was raised by a unique or primary key
+    constraint, rather than e.g. a NOT NULL or foreign key constraint
+    """
+    orig = error.orig
+    sqlstate = getattr(orig, 'pgcode', None) or getattr(orig, 'sqlstate', None)
+    if sqlstate is not None:
+        return sqlstate == UNIQUE_VIOLATION_SQLSTATE
+    if orig.args and orig.args[0] == MYSQL_DUPLICATE_ENTRY:
+        return True
+    # SQLite only distinguishes the constraint in its message
+    return str(orig).startswith('UNIQUE constraint failed')
+
+
+# Memoized per Model just like cached_sqlalchemy_to_pydantic, so that
+# instantiating further backends on the same table derives nothing anew
+@lru_cache(maxsize=None)
+def cached_primary_keys_from_table(Model) -> Dict[str, Any]:
+    return get_primary_keys_from_table(Model)
+
+
+@lru_cache(maxsize=None)
+def cached_delete_schema(Model) -> Type[BaseModel]:
+    return create_model(
+        f'{Model.__name__}.Delete', __config__=ORMConfig,
+        **{n: (t, ...) for n, t in cached_primary_keys_from_table(Model).items()})  # type: ignore
+
+
+@lru_cache(maxsize=None)
+def cached_create_many_schema(Model) -> Type[BaseModel]:
+    class CreateManySchema(BaseModel):
+        records: List[cached_sqlalchemy_to_pydantic(Model)]
+    return CreateManySchema
+
+
+@lru_cache(maxsize=None)
+def cached_output_query_schema(Model) -> Type[BaseModel]:
+    class OutputQuerySchema(BaseModel):
+        results: List[cached_sqlalchemy_to_pydantic(Model)]
+    return OutputQuerySchema
+
+
 class SQLAlchemyCRUDBackend(CRUDBackend):
     """
     A CRUD backend for SQLAlchemy operations on the contents of a given table.
@@ -132,9 +243,40 @@ class SQLAlchemyCRUDBackend(CRUDBackend):
     Model: Any               # TODO: typing according to declarative_base
 
     def _get_by_primary_keys(self, session, data):
-        return session.query(self.Model).filter_by(
-                **{k: data[k] for k, _ in self.primary_keys.items()}) \
-                .all()
+        """
+        The record with the primary keys given in data, or None.
+        Checks the session's identity map before querying the database.
+        """
+        model = session.query(self.Model).get(self._primary_key_of(data))
+        # The identity map still holds records deleted by the session until
+        # it's flushed
+        if model is not None and model in session.deleted:
+            return None
+        return model
+
+    def _exists_by_primary_keys(self, session, data) -> bool:
+        # Selects a constant, so that no row is loaded into an ORM instance
+        return session.query(literal(1)).filter(*(
+                column == data[k] for k, column in self._primary_key_columns)) \
+                .first() is not None
+
+    # The schemas are derived from Model through expensive reflection and
+    # pydantic model generation, so each is built at most once per Model
+    @cached_property
+    def Schema(self) -> Type[BaseModel]:
+        return cached_sqlalchemy_to_pydantic(self.Model)
+
+    @cached_property
+    def DeleteSchema(self) -> Type[BaseModel]:
+        return cached_delete_schema(self.Model)
+
+    @cached_property
+    def CreateManySchema(self) -> Type[BaseModel]:
+        return cached_create_many_schema(self.Model)
+
+    @cached_property
+    def OutputQuerySchema(self) -> Type[BaseModel]:
+        return cached_output_query_schema(self.Model)
 
     def __init__(
             self,
@@ -143,58 +285,105 @@ class SQLAlchemyCRUDBackend(CRUDBackend):
 
         self.Model = Model
         self.session_maker = session_maker
-        self.Schema = sqlalchemy_to_pydantic(Model)
-        self.primary_keys: Dict[str, Any] = get_primary_keys_from_table(Model)
-        self.DeleteSchema = create_model(
-            f'{Model.__name__}.Delete', __config__=ORMConfig,
-            **{n: (t, ...) for n, t in self.primary_keys.items()})  # type: ignore
-        class OutputQuerySchema(BaseModel):
-            results: List[self.Schema]
-        self.OutputQuerySchema = OutputQuerySchema
+        self.primary_keys: Dict[str, Any] = cached_primary_keys_from_table(Model)
+        self._primary_key_names = tuple(self.primary_keys)
+        # Extracts the identity that Query.get takes from data in C: the
+        # value itself for a single primary key, else the tuple of values
+        self._primary_key_of = itemgetter(*self._primary_key_names)
+        self._primary_key_columns = tuple(
+                (k, getattr(Model, k)) for k in self._primary_key_names)
+        CreateManySchema = self.CreateManySchema
+        OutputQuerySchema = self.OutputQuerySchema
+
+        # Rows loaded from or just written to the table are already valid, so
+        # the output schemas are constructed from them without validation
+        schema_fields = tuple(self.Schema.__fields__)
+        schema_columns = [getattr(Model, name) for name in schema_fields]
+        construct_schema = self.Schema.construct
+
+        def from_model(model) -> BaseModel:
+            return construct_schema(
+                **{name: getattr(model, name) for name in schema_fields})
 
         def create(session: Session, data: self.Schema) -> BaseModel:
-            results = self._get_by_primary_keys(session, data.dict())
-            if len(results) == 1:
+            data_dict = data.dict()
+            if self._exists_by_primary_keys(session, data_dict):
                 raise AlreadyExistsError()
-            elif len(results) > 1:
-                raise MultipleRecordsError()
-            model = self.Model(**data.dict())
+            model = self.Model(**data_dict)
             session.add(model)
-            return self.Schema.from_orm(model)
+            return from_model(model)
+
+        def create_many(session: Session, data: CreateManySchema) -> BaseModel:
+            """
+            Insert all of the records in a single executemany, relying upon
+            the table's unique constraints rather than checking for each record
+            """
+            try:
+                session.bulk_insert_mappings(
+                        Model, [d.dict() for d in data.records])
+            except IntegrityError as e:
+                if is_unique_violation(e):
+                    raise AlreadyExistsError() from e
+                raise
+            return data
 
         def read(session: Session, data: QuerySchema) -> List[BaseModel]:
             query_obj = session.query(Model)
-            filtered_query_obj = apply_filters(query_obj, data.dict()['filter_spec']).all()
-            return OutputQuerySchema(results = [self.Schema.from_orm(i) for i in filtered_query_obj])
+            # Only the schema's columns are selected, and the statement is
+            # executed directly, so that the rows are taken from the DBAPI
+            # cursor without any ORM post-processing
+            statement = apply_filters(query_obj, data.filter_spec_dict()) \
+                    .with_entities(*schema_columns).statement
+            if session.autoflush:
+                # As Query would, so that pending changes are visible
+                session.flush()
+            rows = session.execute(statement).fetchall()
+            return OutputQuerySchema.construct(results = [
+                construct_schema(**dict(zip(schema_fields, row))) for row in rows])
 
         def update(session: Session, data: self.Schema) -> BaseModel:
-            results = self._get_by_primary_keys(session, data.dict())
-            if len(results) == 0:
-                raise NotFoundError()
-            elif len(results) > 1:
-                raise MultipleRecordsError()
-            model = results[0]
-            for item, value in data.dict().items():
-                setattr(model, item, value)
-            return self.Schema.from_orm(model)
+            data_dict = data.dict()
+            changes = {k: v for k, v in data_dict.items()
+                       if k not in self.primary_keys}
+            if not changes:
+                if not self._exists_by_primary_keys(session, data_dict):
+                    raise NotFoundError()
+            else:
+                # A single UPDATE statement, rather than an attribute event
+                # per column of a loaded model.  Any copy of the record already
+                # in the session is updated to match.
+                updated = session.query(Model).filter(*(
+                        column == data_dict[k]
+                        for k, column in self._primary_key_columns)) \
+                        .update(changes, synchronize_session='evaluate')
+                if updated == 0:
+                    raise NotFoundError()
+            # The record now holds exactly the validated input
+            return construct_schema(**data_dict)
 
         def delete(session: Session, data: self.DeleteSchema) -> None:
-            delete_args = self.DeleteSchema(**data.dict()).dict()
-            results = self._get_by_primary_keys(session, delete_args)
-            if len(results) == 0:
+            # data has already been validated as a DeleteSchema
+            delete_args = {k: getattr(data, k) for k in self._primary_key_names}
+            model = self._get_by_primary_keys(session, delete_args)
+            if model is None:
                 raise NotFoundError()
-            elif len(results) > 1:
-                raise MultipleRecordsError()
-            model = results[0]
+            # The record is snapshotted before it's marked deleted, so that no
+            # attribute is ever loaded from a deleted object
+            deleted = from_model(model)
             session.delete(model)
-            return self.Schema.from_orm(model)
-                
+            return deleted
+
         super().__init__(
             CRUDBackendAccessRecord[self.Schema, self.Schema](
                 self.Schema,
                 self.Schema,
                 create,
                 CRUDAccessType.create),
+            CRUDBackendAccessRecord[CreateManySchema, CreateManySchema](
+                CreateManySchema,
+                CreateManySchema,
+                create_many,
+                CRUDAccessType.create_many),
             CRUDBackendAccessRecord[QuerySchema, OutputQuerySchema](
                 QuerySchema,
                 OutputQuerySchema,
@@ -12,6 +12,7 @@ class CRUDAccessType(BaseAccessType):
     Defines the possible access types for CRUD accesses.
     """
     create = 'create'
+    create_many = 'create_many'
     read = 'read'
     update = 'update'
     delete = 'delete'
@@ -40,6 +41,14 @@ class Create(AccessRecord[CRUDAccessType, InputSchema, OutputSchema]):
     type_: CRUDAccessType = CRUDAccessType.create
 
 
+@dataclass(frozen=True)
+class CreateMany(AccessRecord[CRUDAccessType, InputSchema, OutputSchema]):
+    """
+    AccessRecord for CRUD to create several records at once
+    """
+    type_: CRUDAccessType = CRUDAccessType.create_many
+
+
 @dataclass(frozen=True)
 class Read(AccessRecord[CRUDAccessType, InputSchema, OutputSchema]):
     """
@@ -77,6 +86,9 @@ class CRUDResource(Resource[CRUDAccessType]):
     async def create(self, *args, **kwargs) -> OutputSchema:
         return await super().__call__(CRUDAccessType.create, *args, **kwargs)
 
+    async def create_many(self, *args, **kwargs) -> OutputSchema:
+        return await super().__call__(CRUDAccessType.create_many, *args, **kwargs)
+
     async def read(self, *args, **kwargs) -> OutputSchema:
         return await super().__call__(CRUDAccessType.read, *args, **kwargs)
 
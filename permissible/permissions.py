@@ -1,7 +1,7 @@
 # Defines the core permissions settings of the system
 from dataclasses import dataclass
 from enum import Enum, auto
-from typing import Any, List
+from typing import AbstractSet, Any, Callable, Dict, List, Tuple, Union
 
 
 class UnauthorisedError(Exception):
@@ -47,13 +47,140 @@ class Permission:
     principal: Principal
 
 
-def has_permission(principals: List[Principal],
+def has_permission(principals: Union[List[Principal], AbstractSet[Principal]],
                    permissions: List[Permission]) -> Action:
     """
     Returns the Action that a user with _principals_ can perform on an
     access with _permissions_
+    Passing the _principals_ as a set saves converting them on each call.
     """
+    if not isinstance(principals, AbstractSet):
+        # The principals are tested against every permission, so hash them
+        try:
+            principals = frozenset(principals)
+        except TypeError:
+            # Principals with unhashable values can only be compared
+            pass
     for permission in permissions:
-        if permission.principal in principals:
+        try:
+            found = permission.principal in principals
+        except TypeError:
+            # Nor can an unhashable principal be looked up in a set
+            found = any(permission.principal == principal
+                        for principal in principals)
+        if found:
             return permission.action
     return Action.DENY
+
+
+def build_permission_index(permissions: List[Permission]
+                           ) -> Dict[Principal, Tuple[int, Action]]:
+    """
+    Maps each principal to the position and action of the first of the
+    _permissions_ granted to it
+    """
+    index: Dict[Principal, Tuple[int, Action]] = {}
+    for position, permission in enumerate(permissions):
+        index.setdefault(permission.principal, (position, permission.action))
+    return index
+
+
+def has_permission_indexed(principals: List[Principal],
+                           index: Dict[Principal, Tuple[int, Action]]
+                           ) -> Action:
+    """
+    As has_permission, but looking each of the _principals_ up in an index
+    built by build_permission_index.  The earliest matching permission
+    still wins, regardless of the order of the _principals_.
+    """
+    first = None
+    for principal in principals:
+        entry = index.get(principal)
+        if entry is not None and (first is None or entry[0] < first[0]):
+            first = entry
+    return Action.DENY if first is None else first[1]
+
+
+class BasePermissions:
+    """
+    The permissions of an access, evaluated either before the backend is
+    accessed, or afterwards on its output data.
+    """
+    before_access: bool
+
+    def check(self, principals: List[Principal],
+              output_data: Any = None) -> bool:
+        """
+        Returns whether a user with _principals_ is permitted to perform the
+        access
+        """
+        raise NotImplementedError('Subclass implements this')
+
+
+class StaticPermissions(BasePermissions):
+    """
+    A fixed list of permissions, which is known before the access is made.
+    """
+    before_access = True
+
+    def __init__(self, permissions: List[Permission]):
+        self.permissions = permissions
+        # Users matching only allowing or only other principals are decided
+        # by set membership; only users matching both need the ordered scan
+        try:
+            self._allowing = frozenset(p.principal for p in permissions
+                                       if p.action == Action.ALLOW)
+            self._other = frozenset(p.principal for p in permissions
+                                    if p.action != Action.ALLOW)
+            self._index = build_permission_index(permissions)
+        except TypeError:
+            # Principals with unhashable values can only be compared
+            self._index = None
+
+    def check(self, principals: List[Principal],
+              output_data: Any = None) -> bool:
+        if self._index is not None:
+            try:
+                if self._allowing.isdisjoint(principals):
+                    return False
+                elif self._other.isdisjoint(principals):
+                    return True
+                else:
+                    return has_permission_indexed(principals, self._index) \
+                        == Action.ALLOW
+            except TypeError:
+                pass
+        # As for has_permission, which the above must agree with
+        return has_permission(principals, self.permissions) == Action.ALLOW
+
+
+class DynamicPermissions(BasePermissions):
+    """
+    Permissions which depend upon the output data of the access.
+    """
+    before_access = False
+
+    def __init__(self, permissions: Callable[[Any], List[Permission]]):
+        self.permissions = permissions
+
+    def check(self, principals: List[Principal],
+              output_data: Any = None) -> bool:
+        return has_permission(principals, self.permissions(output_data)) \
+            == Action.ALLOW
+
+
+def as_permissions(
+        permissions: Union[BasePermissions,
+                           List[Permission],
+                           Callable[[Any], List[Permission]]]
+        ) -> BasePermissions:
+    """
+    Wraps the permissions of an AccessRecord in the appropriate
+    BasePermissions
+    """
+    if isinstance(permissions, BasePermissions):
+        return permissions
+    elif isinstance(permissions, list):
+        return StaticPermissions(permissions)
+    else:
+        return DynamicPermissions(permissions)
@@ -0,0 +1,212 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip('arq')
+fakeredis_aioredis = pytest.importorskip('fakeredis.aioredis')
+
+from arq.connections import ArqRedis
+from arq.jobs import serialize_result
+from arq.constants import abort_jobs_ss, in_progress_key_prefix, \
+        job_key_prefix, result_key_prefix
+
+from permissible.crud.backends.arq import ARQBackend, ARQSession, \
+        ARQSessionMaker, ArqSessionAbortFailure, CreateSchema, GetSchema, \
+        PoolJobAlreadyExists, PoolJobCompleted, get_status_from_pool, \
+        wait_for_result_in_pool
+
+
+def run(test):
+    async def with_pool():
+        redis = await fakeredis_aioredis.create_redis_pool(encoding='utf8')
+        pool = ArqRedis(redis._pool_or_conn)
+        try:
+            await test(pool, ARQBackend(ARQSessionMaker(pool=pool)))
+        finally:
+            pool.close()
+            await pool.wait_closed()
+    asyncio.run(with_pool())
+
+
+async def enqueue(backend, job_id):
+    session = backend.session_maker()
+    await backend.create(session, CreateSchema(function='f', job_id=job_id))
+    await session.commit()
+
+
+async def start(pool, key_prefix, job_id):
+    # Mark the job as having been picked up, or completed, by a worker
+    if key_prefix == result_key_prefix:
+        value = serialize_result('f', (), {}, 1, 0, True, None, 0, 0, job_id,
+                                 pool.default_queue_name)
+    else:
+        value = b'1'
+    await pool.set(key_prefix + job_id, value)
+
+
+def test_commit_enqueues():
+    async def test(pool, backend):
+        await enqueue(backend, 'a')
+        assert await pool.exists(job_key_prefix + 'a')
+        assert await get_status_from_pool(pool, 'a', pool.default_queue_name) \
+            == 'queued'
+    run(test)
+
+
+def test_create_existing():
+    async def test(pool, backend):
+        await enqueue(backend, 'a')
+        with pytest.raises(PoolJobAlreadyExists):
+            await backend.create(backend.session_maker(),
+                                 CreateSchema(function='f', job_id='a'))
+    run(test)
+
+
+def test_create_after_delete_in_session():
+    async def test(pool, backend):
+        session = backend.session_maker()
+        await backend.create(session, CreateSchema(function='f', job_id='a'))
+        await backend.delete(session, GetSchema(job_id='a'))
+        await backend.create(session, CreateSchema(function='g', job_id='a'))
+        assert (await backend.read(session, GetSchema(job_id='a'))).function \
+            == 'g'
+        await session.commit()
+        read = await backend.read(backend.session_maker(), GetSchema(job_id='a'))
+        assert read.function == 'g'
+        assert read.status == 'queued'
+    run(test)
+
+
+def test_create_after_delete_of_enqueued_job():
+    async def test(pool, backend):
+        # An aborted job's keys remain in the pool, so it can't be re-enqueued
+        await enqueue(backend, 'a')
+        session = backend.session_maker()
+        await backend.delete(session, GetSchema(job_id='a'))
+        with pytest.raises(PoolJobAlreadyExists):
+            await backend.create(session, CreateSchema(function='g', job_id='a'))
+    run(test)
+
+
+def test_abort_queued():
+    async def test(pool, backend):
+        await enqueue(backend, 'a')
+        session = backend.session_maker()
+        await backend.delete(session, GetSchema(job_id='a'))
+        await session.commit()
+        assert await pool.zscore(abort_jobs_ss, 'a') is not None
+    run(test)
+
+
+@pytest.mark.parametrize('key_prefix', [in_progress_key_prefix,
+                                        result_key_prefix])
+def test_delete_started(key_prefix):
+    async def test(pool, backend):
+        await enqueue(backend, 'a')
+        await start(pool, key_prefix, 'a')
+        with pytest.raises(PoolJobCompleted):
+            await backend.delete(backend.session_maker(), GetSchema(job_id='a'))
+    run(test)
+
+
+@pytest.mark.parametrize('key_prefix', [in_progress_key_prefix,
+                                        result_key_prefix])
+def test_abort_started_before_commit(key_prefix):
+    async def test(pool, backend):
+        await enqueue(backend, 'a')
+        session = backend.session_maker()
+        await backend.delete(session, GetSchema(job_id='a'))
+        # The job starts between the delete and the commit
+        await start(pool, key_prefix, 'a')
+        with pytest.raises(ArqSessionAbortFailure):
+            await session.commit()
+        assert await pool.zscore(abort_jobs_ss, 'a') is None
+    run(test)
+
+
+def test_create_and_delete_in_session_sends_nothing():
+    async def test(pool, backend):
+        session = backend.session_maker()
+        await backend.create(session, CreateSchema(function='f', job_id='a'))
+        await backend.delete(session, GetSchema(job_id='a'))
+        await session.commit()
+        assert not await pool.exists(job_key_prefix + 'a')
+        assert await pool.zscore(abort_jobs_ss, 'a') is None
+    run(test)
+
+
+def test_commit_spends_operations_after_abort_failure():
+    async def test(pool, backend):
+        await enqueue(backend, 'a')
+        session = backend.session_maker()
+        await backend.delete(session, GetSchema(job_id='a'))
+        await backend.create(session, CreateSchema(function='f', job_id='b'))
+        await start(pool, in_progress_key_prefix, 'a')
+        with pytest.raises(ArqSessionAbortFailure):
+            await session.commit()
+        # The rest of the transaction was applied, and isn't replayed
+        assert await pool.exists(job_key_prefix + 'b')
+        assert session.operations == []
+        await session.commit()
+    run(test)
+
+
+def test_commit_conflicting_enqueue(monkeypatch):
+    async def test(pool, backend):
+        session = backend.session_maker()
+        await backend.create(session, CreateSchema(function='f', job_id='a'))
+
+        # Another client enqueues the job between the check and the EXEC
+        other = await pool.connection.acquire()
+        enqueued = []
+        net_operations = ARQSession._net_operations
+        def racing(operations, existing):
+            enqueued.append(other.execute('SET', job_key_prefix + 'a', 'x'))
+            return net_operations(operations, existing)
+        monkeypatch.setattr(ARQSession, '_net_operations', staticmethod(racing))
+        try:
+            with pytest.raises(PoolJobAlreadyExists):
+                await session.commit()
+            await asyncio.gather(*enqueued)
+        finally:
+            pool.connection.release(other)
+        assert session.operations == []
+        assert await pool.zscore(pool.default_queue_name, 'a') is None
+    run(test)
+
+
+def test_read_many():
+    async def test(pool, backend):
+        await enqueue(backend, 'a')
+        await enqueue(backend, 'b')
+        await start(pool, in_progress_key_prefix, 'b')
+        await enqueue(backend, 'c')
+        await start(pool, result_key_prefix, 'c')
+        results = await backend.read_many(
+            backend.session_maker(), [GetSchema(job_id=j) for j in 'abc'])
+        assert [r.status for r in results] == \
+            ['queued', 'in_progress', 'complete']
+    run(test)
+
+
+def test_wait_for_result_rejects_multiplexed_connection():
+    async def test():
+        redis = await fakeredis_aioredis.create_redis(encoding='utf8')
+        conn = ArqRedis(redis._pool_or_conn)
+        try:
+            with pytest.raises(ValueError, match='multiplexed'):
+                await wait_for_result_in_pool(conn, 'a', timeout=0)
+            # The connection is left usable, outside of pub/sub mode
+            assert not await conn.exists(result_key_prefix + 'a')
+        finally:
+            conn.close()
+            await conn.wait_closed()
+    asyncio.run(test())
+
+
+def test_wait_for_result_in_pool():
+    async def test(pool, backend):
+        assert not await wait_for_result_in_pool(pool, 'a', timeout=0)
+        await start(pool, result_key_prefix, 'a')
+        assert await wait_for_result_in_pool(pool, 'a', timeout=1)
+    run(test)
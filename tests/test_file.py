@@ -0,0 +1,115 @@
+from io import BytesIO
+import os
+
+import pytest
+
+pytest.importorskip('fasteners')
+
+from permissible.crud.backends.file import FileCreateSchema, \
+        FileDeleteSchema, FileReadSchema, FileSession, FileUpdateSchema, \
+        lock_path
+
+
+def contents(path):
+    return {p.name: p.read_bytes() for p in path.iterdir()
+            if not p.name.endswith('.lock')}
+
+
+def create(session, data):
+    schema = FileCreateSchema(file=BytesIO(data))
+    session.add(schema)
+    return schema.uuid
+
+
+def test_commit_writes(tmp_path):
+    session = FileSession(tmp_path)
+    uuids = [create(session, b'%d' % i) for i in range(3)]
+    session.commit()
+    assert contents(tmp_path) == {u.hex: b'%d' % i for i, u in enumerate(uuids)}
+
+
+def test_commit_update_and_delete(tmp_path):
+    session = FileSession(tmp_path)
+    updated, deleted = create(session, b'old'), create(session, b'gone')
+    session.commit()
+
+    session.add(FileUpdateSchema(uuid=updated, file=BytesIO(b'new')))
+    session.add(FileDeleteSchema(uuid=deleted))
+    session.commit()
+    assert contents(tmp_path) == {updated.hex: b'new'}
+    assert not os.path.exists(lock_path(tmp_path / deleted.hex))
+
+
+def test_commit_subclassed_operation(tmp_path):
+    class Upload(FileCreateSchema):
+        pass
+
+    session = FileSession(tmp_path)
+    schema = Upload(file=BytesIO(b'data'))
+    session.add(schema)
+    session.commit()
+    assert contents(tmp_path) == {schema.uuid.hex: b'data'}
+
+
+def test_rollback(tmp_path):
+    session = FileSession(tmp_path)
+    uuid = create(session, b'data')
+    session.rollback()
+    assert contents(tmp_path) == {}
+    # The lock was released, so another session may take the uuid
+    other = FileSession(tmp_path)
+    other.add(FileCreateSchema(uuid=uuid, file=BytesIO(b'other')))
+    other.commit()
+    assert contents(tmp_path) == {uuid.hex: b'other'}
+
+
+def test_failed_write_rolls_back(tmp_path):
+    class Unreadable(BytesIO):
+        def read(self, *args):
+            raise OSError('unreadable')
+
+    session = FileSession(tmp_path)
+    uuid = create(session, b'data')
+    session.add(FileCreateSchema(file=Unreadable()))
+    with pytest.raises(OSError):
+        session.commit()
+    # Neither file is written, nor any temporary left behind
+    assert contents(tmp_path) == {}
+    assert not session.state
+
+
+def test_query_pending_and_committed(tmp_path):
+    session = FileSession(tmp_path)
+    schema = FileCreateSchema(file=BytesIO(b'data'))
+    session.add(schema)
+    assert session.query(FileReadSchema(uuid=schema.uuid)) is schema
+    session.commit()
+
+    session = FileSession(tmp_path)
+    with session.query(FileReadSchema(uuid=schema.uuid)) as f:
+        assert f.read() == b'data'
+    session.rollback()
+
+
+def test_unknown_operation(tmp_path):
+    session = FileSession(tmp_path)
+    uuid = create(session, b'data')
+    session.state[uuid] = (object(),) + session.state[uuid][1:]
+    with pytest.raises(TypeError):
+        session.commit()
+    assert contents(tmp_path) == {}
+
+
+def test_commit_query_only_skips_directory_sync(tmp_path, monkeypatch):
+    synced = []
+    monkeypatch.setattr(FileSession, '_sync_directory',
+                        lambda self: synced.append(self.path))
+    session = FileSession(tmp_path)
+    uuid = create(session, b'data')
+    session.commit()
+    assert synced == [tmp_path]
+
+    session = FileSession(tmp_path)
+    session.query(FileReadSchema(uuid=uuid)).close()
+    session.commit()
+    assert synced == [tmp_path]
@@ -0,0 +1,15 @@
+import importlib
+
+import pytest
+
+
+@pytest.mark.parametrize('module, dependency', [
+    ('permissible.crud.backends.arq', 'arq'),
+    ('permissible.crud.backends.file', 'fasteners'),
+    ('permissible.crud.backends.print', None),
+    ('permissible.crud.backends.sqlalchemy', 'sqlalchemy'),
+])
+def test_backend_imports(module, dependency):
+    if dependency is not None:
+        pytest.importorskip(dependency)
+    importlib.import_module(module)
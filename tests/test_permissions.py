@@ -0,0 +1,27 @@
+from itertools import product
+
+from permissible.permissions import Action, Permission, Principal, \
+        StaticPermissions, has_permission
+
+
+def scan(principals, permissions):
+    for permission in permissions:
+        if permission.principal in list(principals):
+            return permission.action
+    return Action.DENY
+
+
+VALUES = ['admin', 'user', ['admin']]
+PRINCIPALS = [Principal('group', v) for v in VALUES]
+
+
+def test_static_permissions_agree_with_has_permission():
+    candidates = [Permission(a, p) for a, p in product(Action, PRINCIPALS)]
+    for permissions in product(candidates, repeat=2):
+        permissions = list(permissions)
+        static = StaticPermissions(permissions)
+        for principals in product(PRINCIPALS, repeat=2):
+            principals = list(principals)
+            expected = scan(principals, permissions)
+            assert has_permission(principals, permissions) == expected
+            assert static.check(principals) == (expected == Action.ALLOW)
@@ -0,0 +1,128 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip('sqlalchemy')
+
+from sqlalchemy import CheckConstraint, Column, Integer, Text, create_engine
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.orm import sessionmaker
+
+from permissible import CRUDResource, Create, CreateMany, Action, \
+        Permission, Principal
+from permissible.core import Transaction, transaction_manager
+from permissible.crud.core import CRUDAccessType
+from permissible.crud.backends.sqlalchemy import AlreadyExistsError, \
+        BinFilter, NotFoundError, QuerySchema, SQLAlchemyCRUDBackend
+from permissible.permissions import UnauthorisedError
+
+Base = declarative_base()
+
+
+class Profile(Base):
+    __tablename__ = 'profile'
+    id = Column(Integer(), primary_key=True)
+    name = Column(Text())
+    age = Column(Integer(), CheckConstraint('age >= 0'))
+
+
+@pytest.fixture
+def backend():
+    engine = create_engine('sqlite://')
+    Base.metadata.create_all(engine)
+    return SQLAlchemyCRUDBackend(Profile, sessionmaker(bind=engine))
+
+
+def access(backend, type_, data, transaction):
+    return asyncio.run(backend(type_, data, transaction))
+
+
+def test_delete_twice_in_session(backend):
+    transaction = Transaction()
+    access(backend, CRUDAccessType.create, {'id': 1, 'name': 'a'}, transaction)
+    access(backend, CRUDAccessType.delete, {'id': 1}, transaction)
+    with pytest.raises(NotFoundError):
+        access(backend, CRUDAccessType.delete, {'id': 1}, transaction)
+
+
+def test_read_uses_validated_filter_spec(backend):
+    transaction = Transaction()
+    for i in range(3):
+        access(backend, CRUDAccessType.create, {'id': i, 'name': str(i)},
+               transaction)
+    spec = [{'or': [{'field': 'id', 'op': '==', 'value': 1},
+                    {'field': 'name', 'op': '==', 'value': '2'}]}]
+    query = QuerySchema(filter_spec=spec)
+    spec.clear()
+    results = access(backend, CRUDAccessType.read, query, transaction).results
+    assert sorted(r.id for r in results) == [1, 2]
+
+
+def test_filter_spec_dict():
+    spec = [{'not': [{'field': 'id', 'op': 'is_null', 'value': 1}]},
+            {'field': 'name', 'op': '==', 'model': 'Profile'}]
+    query = QuerySchema(filter_spec=spec)
+    assert query.filter_spec_dict() == query.dict(by_alias=True)['filter_spec']
+
+    models = [BinFilter(field='id', op='==', value=1)]
+    expected = [{'field': 'id', 'op': '==', 'value': 1}]
+    assert QuerySchema.construct(filter_spec=models).filter_spec_dict() \
+        == expected
+    assert query.copy(update={'filter_spec': models}).filter_spec_dict() \
+        == expected
+
+
+def test_create_many(backend):
+    Schema = backend.CreateManySchema
+    resource = CRUDResource(
+        CreateMany[Schema, Schema](
+            name='create_many',
+            permissions=[Permission(Action.ALLOW, Principal('group', 'admin'))],
+            input_schema=Schema,
+            output_schema=Schema),
+        backend=backend)
+    admin = [Principal('group', 'admin')]
+    records = {'records': [{'id': 1, 'name': 'a'}, {'id': 2, 'name': 'b'}]}
+
+    with pytest.raises(UnauthorisedError):
+        asyncio.run(resource.create_many(
+            'create_many', records, [Principal('group', 'user')]))
+    asyncio.run(resource.create_many('create_many', records, admin))
+    with pytest.raises(AlreadyExistsError):
+        asyncio.run(resource.create_many('create_many', records, admin))
+    with pytest.raises(IntegrityError) as error:
+        asyncio.run(resource.create_many(
+            'create_many', {'records': [{'id': 3, 'age': -1}]}, admin))
+    assert not isinstance(error.value, AlreadyExistsError)
+
+
+def test_access_joins_enclosing_transaction_manager(backend):
+    resource = CRUDResource(
+        Create[backend.Schema, backend.Schema](
+            name='create',
+            permissions=[Permission(Action.ALLOW, Principal('group', 'admin'))],
+            input_schema=backend.Schema,
+            output_schema=backend.Schema),
+        backend=backend)
+    admin = [Principal('group', 'admin')]
+
+    async def count():
+        query = QuerySchema(filter_spec=[])
+        output = await backend(CRUDAccessType.read, query, Transaction())
+        return len(output.results)
+
+    async def test():
+        with pytest.raises(ValueError):
+            async with transaction_manager() as transaction:
+                # Made without a transaction, so deferred to the outer block
+                await resource.create('create', {'id': 1, 'name': 'a'}, admin)
+                assert transaction.sessions
+                assert await count() == 0
+                raise ValueError
+        assert await count() == 0
+
+        async with transaction_manager():
+            await resource.create('create', {'id': 1, 'name': 'a'}, admin)
+        assert await count() == 1
+    asyncio.run(test())